@@ -0,0 +1 @@
+"""Throughput and memory benchmarks of the parsers on synthetic inputs; run with ``python -m benchmarks``."""
@@ -0,0 +1,336 @@
+"""Generators of synthetic, arbitrarily large DFT output files.
+
+Every generator writes to an open text file and scales with its size
+arguments; values are drawn from a seeded random generator, so the same
+arguments always produce the same file.
+"""
+import random
+
+_EPSILON_COLUMNS = ('Re_eps_xx', 'Im_eps_xx', 'Re_eps_zz', 'Im_eps_zz')
+_OPTICS_HEADERS = {
+    'epsilon': (None, _EPSILON_COLUMNS),
+    'sigmak': ('optical conductivity sigma in [10^15 / sec]',
+               ('Re_sigma_xx', 'Im_sigma_xx', 'Re_sigma_zz', 'Im_sigma_zz')),
+    'absorp': ('optical conductivity sigma in [1 / (Ohm cm)]       absorption in [10^4 / cm)]',
+               ('Re_sigma_xx', 'Re_sigma_zz', 'absorp_xx', 'absorp_zz')),
+    'refraction': (None, ('ref_ind_xx', 'ref_ind_zz', 'extinct_xx', 'extinct_zz')),
+    'reflectivity': (None, ('reflect_xx', 'reflect_zz')),
+    'eloss': (None, ('eloss_xx', 'eloss_zz')),
+}
+
+
+def _vector(rng, scale=1.0):
+    return [rng.uniform(-scale, scale) for _ in range(3)]
+
+
+def _pwscf_kpoints(f, rng, kpoints, verbosity):
+    f.write("     number of k points={:6d}  Marzari-Vanderbilt smearing, width (Ry)=  0.0100\n".format(kpoints))
+    if kpoints > 100 and verbosity != 'high':
+        f.write("\n     Number of k-points >= 100: set verbosity='high' to print them.\n\n")
+        return
+    points = [_vector(rng, 0.5) for _ in range(kpoints)]
+    weight = 2.0 / kpoints
+    for system, scale in (('cart. coord. in units 2pi/alat', 1.0), ('cryst. coord.', 0.5)):
+        if system.startswith('cryst.'):
+            if verbosity != 'high':
+                break
+            f.write("\n")
+        f.write("                       {}\n".format(system))
+        for i, k in enumerate(points):
+            f.write("        k({:5d}) = ({:12.7f}{:12.7f}{:12.7f}), wk ={:12.7f}\n".format(
+                i + 1, k[0] * scale, k[1] * scale, k[2] * scale, weight))
+    f.write("\n")
+
+
+def _pwscf_bands(f, rng, kpoints, bands, nspin, fermi, verbosity):
+    for spin in range(nspin):
+        if nspin == 2:
+            f.write(" ------ SPIN {} ----------\n\n\n".format('UP ' if spin == 0 else 'DOWN'))
+        for _ in range(kpoints):
+            k = _vector(rng, 0.5)
+            f.write("          k ={:7.4f}{:7.4f}{:7.4f} ({:6d} PWs)   bands (ev):\n\n".format(
+                k[0], k[1], k[2], rng.randint(100, 999)))
+            energies = sorted(rng.uniform(fermi - 10.0, fermi + 10.0) for _ in range(bands))
+            for start in range(0, bands, 8):
+                f.write("  " + "".join("{:9.4f}".format(e) for e in energies[start:start + 8]) + "\n")
+            if verbosity == 'high':
+                f.write("\n     occupation numbers \n")
+                occupations = [1.0 if e < fermi - 0.1 else 0.0 if e > fermi + 0.1 else rng.random()
+                               for e in energies]
+                for start in range(0, bands, 8):
+                    f.write("  " + "".join("{:9.4f}".format(o) for o in occupations[start:start + 8]) + "\n")
+            f.write("\n")
+
+
+def pwscf_stdout(f, steps=10, atoms=8, kpoints=10, bands=16, scf_iterations=6, calculation='relax',
+                 nspin=1, verbosity='high', seed=0):
+    """Write a PWscf standard output of a relax, vc-relax or md run with ``steps`` ionic steps"""
+    rng = random.Random(seed)
+    alat = 10.2
+    cell = [[alat / 2 * (i == j) + rng.uniform(-0.01, 0.01) for j in range(3)] for i in range(3)]
+    positions = [_vector(rng, 2.0) for _ in range(atoms)]
+
+    f.write("\n     Program PWSCF v.6.4.1 starts on 12Jul2019 at 10:17:52 \n\n")
+    f.write("     This program is part of the open-source Quantum ESPRESSO suite\n\n")
+    f.write("     Reading input from {}.in\n\n".format(calculation))
+    f.write("     bravais-lattice index     =            0\n")
+    f.write("     lattice parameter (alat)  ={:13.4f}  a.u.\n".format(alat))
+    f.write("     unit-cell volume          ={:13.4f} (a.u.)^3\n".format(alat ** 3 / 4))
+    f.write("     number of atoms/cell      ={:13d}\n".format(atoms))
+    f.write("     number of atomic types    =            1\n")
+    f.write("     number of electrons       ={:13.2f}\n".format(4.0 * atoms))
+    f.write("     number of Kohn-Sham states={:13d}\n".format(bands))
+    f.write("     kinetic-energy cutoff     =      30.0000  Ry\n")
+    f.write("     charge density cutoff     =     120.0000  Ry\n")
+    f.write("     convergence threshold     =      1.0E-08\n")
+    f.write("     mixing beta               =       0.7000\n")
+    f.write("     number of iterations used =            8  plain     mixing\n")
+    f.write("     Exchange-correlation      = SLA PW PBX PBC ( 1  4  3  4 0 0)\n\n")
+    f.write("     crystal axes: (cart. coord. in units of alat)\n")
+    for i, a in enumerate(cell):
+        f.write("               a({}) = ({:11.6f}{:11.6f}{:11.6f} )  \n".format(i + 1, *(x / alat for x in a)))
+    f.write("\n     PseudoPot. # 1 for Si read from file:\n     /home/user/pseudo/Si.pbe-n-rrkjus_psl.1.0.0.UPF\n\n")
+    if nspin == 2:
+        f.write("     Starting magnetic structure \n     atomic species    magnetization\n        Si           0.500\n\n")
+    f.write("   Cartesian axes\n\n     site n.     atom                  positions (alat units)\n")
+    for i, p in enumerate(positions):
+        f.write("         {:d}           Si  tau({:4d}) = ({:12.7f}{:12.7f}{:12.7f}  )\n".format(
+            i + 1, i + 1, *(x / (alat * 0.52917721067) for x in p)))
+    f.write("\n")
+    _pwscf_kpoints(f, rng, kpoints, verbosity)
+
+    energy = -15.8 * atoms
+    cpu = 0.0
+    for step in range(steps):
+        f.write("     Self-consistent Calculation\n\n")
+        for iteration in range(scf_iterations):
+            cpu += rng.uniform(0.1, 1.0)
+            f.write("     iteration #{:3d}     ecut=    30.00 Ry     beta= 0.70\n".format(iteration + 1))
+            f.write("     Davidson diagonalization with overlap\n")
+            f.write("     ethr =  1.00E-02,  avg # of iterations =  2.0\n\n")
+            f.write("     total cpu time spent up to now is {:10.1f} secs\n\n".format(cpu))
+            f.write("     total energy              ={:17.8f} Ry\n".format(energy + 10.0 ** -iteration))
+            f.write("     estimated scf accuracy    <{:17.8f} Ry\n".format(10.0 ** -(iteration + 1)))
+            if nspin == 2:
+                f.write("\n     total magnetization       ={:9.2f} Bohr mag/cell\n".format(rng.uniform(1.9, 2.1)))
+                f.write("     absolute magnetization    ={:9.2f} Bohr mag/cell\n".format(rng.uniform(2.1, 2.3)))
+            f.write("\n")
+        f.write("     End of self-consistent calculation\n\n")
+        fermi = rng.uniform(5.0, 7.0)
+        _pwscf_bands(f, rng, kpoints, bands, nspin, fermi, verbosity)
+        f.write("     the Fermi energy is {:10.4f} ev\n\n".format(fermi))
+        f.write("!    total energy              ={:17.8f} Ry\n".format(energy))
+        f.write("     estimated scf accuracy    <{:17.8f} Ry\n".format(1e-9))
+        f.write("     smearing contrib. (-TS)   ={:17.8f} Ry\n".format(-rng.uniform(0, 1e-3)))
+        f.write("     internal energy E=F+TS    ={:17.8f} Ry\n\n".format(energy))
+        f.write("     The total energy is F=E-TS. E is the sum of the following terms:\n")
+        for name in ('one-electron', 'hartree', 'xc', 'ewald'):
+            f.write("     {:26s}={:17.8f} Ry\n".format(name + ' contribution', rng.uniform(-20, 20)))
+        f.write("\n     convergence has been achieved in {:3d} iterations\n\n".format(scf_iterations))
+
+        f.write("     Forces acting on atoms (cartesian axes, Ry/au):\n\n")
+        for i in range(atoms):
+            f.write("     atom {:4d} type  1   force = {:14.8f}{:14.8f}{:14.8f}\n".format(i + 1, *_vector(rng, 0.01)))
+        f.write("\n     Total force = {:12.6f}     Total SCF correction = {:12.6f}\n\n\n".format(
+            rng.uniform(0, 0.05), rng.uniform(0, 1e-5)))
+        pressure = rng.uniform(-20, 20)
+        f.write("     Computing stress (Cartesian axis) and pressure\n\n")
+        f.write("          total   stress  (Ry/bohr**3)                   (kbar)     P={:12.2f}\n".format(pressure))
+        for i in range(3):
+            kbar = [pressure * (i == j) + rng.uniform(-1, 1) * (i != j) for j in range(3)]
+            f.write("  " + "".join("{:13.8f}".format(s / 147105.08) for s in kbar)
+                    + "    " + "".join("{:12.2f}".format(s) for s in kbar) + "\n")
+        f.write("\n")
+
+        energy -= rng.uniform(0, 1e-3)
+        positions = [[x + rng.uniform(-0.01, 0.01) for x in p] for p in positions]
+        if calculation == 'md':
+            f.write("     Entering Dynamics:    iteration ={:6d}\n".format(step + 1))
+            f.write("                           time      ={:9.4f} pico-seconds\n\n".format((step + 1) * 0.001))
+        else:
+            f.write("     BFGS Geometry Optimization\n\n")
+            f.write("     number of scf cycles    ={:4d}\n".format(step + 1))
+            f.write("     number of bfgs steps    ={:4d}\n\n".format(step))
+            f.write("     energy   new            ={:19.10f} Ry\n\n".format(energy))
+        if calculation == 'vc-relax':
+            cell = [[x + rng.uniform(-0.01, 0.01) for x in a] for a in cell]
+            f.write("CELL_PARAMETERS (alat={:12.8f})\n".format(alat))
+            for a in cell:
+                f.write("".join("{:14.9f}".format(x / alat) for x in a) + "\n")
+            f.write("\n")
+        f.write("ATOMIC_POSITIONS (angstrom)\n")
+        for p in positions:
+            f.write("Si    " + "".join("{:20.10f}".format(x) for x in p) + "\n")
+        f.write("\n")
+        if calculation == 'md':
+            f.write("     kinetic energy (Ekin) = {:17.8f} Ry\n".format(rng.uniform(0, 0.01)))
+            f.write("     temperature           = {:17.8f} K \n".format(rng.uniform(250, 350)))
+            f.write("     Ekin + Etot (const)   = {:17.8f} Ry\n\n".format(energy))
+        f.write("     Writing output data file ./pwscf.save/\n\n")
+
+    if calculation != 'md':
+        f.write("     bfgs converged in {:3d} scf cycles and {:3d} bfgs steps\n".format(steps, steps - 1))
+        f.write("     (criteria: energy <  1.0E-04 Ry, force <  1.0E-03 Ry/Bohr)\n\n")
+        f.write("     End of BFGS Geometry Optimization\n\n")
+    f.write("     PWSCF        : {:8.2f}s CPU {:8.2f}s WALL\n\n".format(cpu, cpu * 1.1))
+    f.write("   This run was terminated on:  10:27:52  12Jul2019\n\n")
+    f.write("=------------------------------------------------------------------------------=\n")
+    f.write("   JOB DONE.\n=------------------------------------------------------------------------------=\n")
+
+
+def outcar(f, steps=10, atoms=8, electronic_steps=8, ispin=2, seed=0):
+    """Write a VASP OUTCAR of a relaxation with ``steps`` ionic steps"""
+    rng = random.Random(seed)
+    rule = "-" * 104
+    lattice = [[5.431 * (i == j) + rng.uniform(-0.01, 0.01) for j in range(3)] for i in range(3)]
+    positions = [[rng.uniform(0, 5.431) for _ in range(3)] for _ in range(atoms)]
+
+    def _lattice_block():
+        volume = lattice[0][0] * lattice[1][1] * lattice[2][2]
+        f.write(" VOLUME and BASIS-vectors are now :\n")
+        f.write(" " + "-" * 77 + "\n")
+        f.write("  energy-cutoff  :      400.00\n")
+        f.write("  volume of cell :{:12.2f}\n".format(volume))
+        f.write("      direct lattice vectors                 reciprocal lattice vectors\n")
+        for a in lattice:
+            f.write(" " + "".join("{:13.9f}".format(x) for x in a)
+                    + "  " + "".join("{:13.9f}".format(x / 29.5) for x in a) + "\n")
+        f.write("\n  length of vectors\n")
+        f.write(" " + "".join("{:13.9f}".format(a[i]) for i, a in enumerate(lattice)) + "\n\n")
+
+    f.write(" vasp.5.4.4.18Apr17-6-g9f103f2a35 (build Sep 18 2018 16:57:57) complex\n  \n")
+    f.write(" executed on             LinuxIFC date 2019.07.12  10:17:52\n")
+    f.write(" running on   16 total cores\n\n")
+    f.write(" POTCAR:    PAW_PBE Si 05Jan2001\n\n")
+    f.write(" Dimension of arrays:\n")
+    f.write("   k-points           NKPTS =     10   k-points in BZ     NKDIM =     10   number of bands    NBANDS=     16\n")
+    f.write("   number of dos      NEDOS =    301   number of ions     NIONS ={:7d}\n\n".format(atoms))
+    f.write("   NELECT ={:13.4f}    total number of electrons\n\n".format(4.0 * atoms))
+    _lattice_block()
+
+    energy = -5.4 * atoms
+    for step in range(steps):
+        for iteration in range(electronic_steps):
+            f.write("-" * 41 + " Iteration {:4d}({:4d})  ".format(step + 1, iteration + 1) + "-" * 39 + "\n\n")
+            f.write("    POTLOK:  cpu time    0.0400: real time    0.0400\n")
+            f.write("    EDDAV :  cpu time    0.2000: real time    0.2000\n\n")
+            magnetization = " magnetization {:15.7f}".format(rng.uniform(1.9, 2.1)) if ispin == 2 else ""
+            f.write(" total energy-change (2. order) :{:18.7E}  ({:14.7E})\n".format(
+                10.0 ** -iteration, 10.0 ** -iteration))
+            f.write(" number of electron {:15.7f}{}\n".format(4.0 * atoms - 5e-7, magnetization))
+            f.write(" augmentation part  {:15.7f}{}\n\n".format(rng.uniform(2, 4), magnetization))
+            f.write("  Free energy of the ion-electron system (eV)\n")
+            f.write("  ---------------------------------------------------\n")
+            f.write("  alpha Z        PSCENC =        76.21472413\n")
+            f.write("  Ewald energy   TEWEN  =     -1254.50154283\n")
+            f.write("  ---------------------------------------------------\n")
+            f.write("  free energy    TOTEN  ={:20.8f} eV\n\n".format(energy + 10.0 ** -iteration))
+            f.write("  energy without entropy ={:17.8f}  energy(sigma->0) ={:17.8f}\n\n\n".format(
+                energy + 10.0 ** -iteration, energy + 10.0 ** -iteration))
+        f.write("  FORCE on cell =-STRESS in cart. coord.  units (eV):\n")
+        f.write("  Direction    XX          YY          ZZ          XY          YZ          ZX\n")
+        f.write("  " + "-" * 86 + "\n")
+        f.write("  Alpha Z    76.21472    76.21472    76.21472\n")
+        stress = [rng.uniform(-10, 10) for _ in range(6)]
+        f.write("  Total   " + "".join("{:12.5f}".format(s / 10) for s in stress) + "\n")
+        f.write("  in kB   " + "".join("{:12.5f}".format(s) for s in stress) + "\n")
+        f.write("  external pressure ={:12.2f} kB  Pullay stress =        0.00 kB\n\n".format(sum(stress[:3]) / 3))
+
+        lattice = [[x + rng.uniform(-0.001, 0.001) for x in a] for a in lattice]
+        positions = [[x + rng.uniform(-0.01, 0.01) for x in p] for p in positions]
+        _lattice_block()
+        f.write(" POSITION                                       TOTAL-FORCE (eV/Angst)\n")
+        f.write(" " + "-" * 83 + "\n")
+        for p in positions:
+            f.write(" " + "".join("{:12.5f}".format(x) for x in p)
+                    + "   " + "".join("{:14.6f}".format(x) for x in _vector(rng, 0.1)) + "\n")
+        f.write(" " + "-" * 83 + "\n")
+        f.write("    total drift:                               -0.000000     -0.000000      0.000000\n\n\n")
+        f.write(rule + "\n\n\n\n")
+        f.write("  FREE ENERGIE OF THE ION-ELECTRON SYSTEM (eV)\n")
+        f.write("  ---------------------------------------------------\n")
+        f.write("  free  energy   TOTEN  ={:20.8f} eV\n\n".format(energy))
+        f.write("  energy  without entropy={:18.8f}  energy(sigma->0) ={:18.8f}\n\n".format(energy, energy))
+        f.write(rule + "\n\n")
+        energy -= rng.uniform(0, 1e-3)
+    f.write(" General timing and accounting informations for this job:\n")
+    f.write(" ========================================================\n\n")
+    f.write("                  Total CPU time used (sec):       12.345\n")
+
+
+def eigenval(f, kpoints=1000, bands=64, ispin=2, atoms=8, seed=0):
+    """Write a VASP EIGENVAL with ``kpoints`` k-points of ``bands`` bands and ``ispin`` spins"""
+    rng = random.Random(seed)
+    nelect = 4 * atoms
+    f.write("{:5d}{:5d}{:5d}{:5d}\n".format(atoms, atoms, 1, ispin))
+    f.write("  0.1255943E+02  0.3840000E-09  0.3840000E-09  0.3840000E-09  0.5000000E-15\n")
+    f.write("  1.000000000000000E-004\n  CAR\n unknown system\n")
+    f.write("{:7d}{:7d}{:7d}\n".format(nelect, kpoints, bands))
+    weight = 1.0 / kpoints
+    occupied = nelect // 2
+    for _ in range(kpoints):
+        f.write("\n  " + "".join("{:15.7E}".format(x) for x in _vector(rng, 0.5)) + "{:15.7E}\n".format(weight))
+        for band in range(bands):
+            energies = [rng.uniform(-10, 0) if band < occupied else rng.uniform(0.5, 10) for _ in range(ispin)]
+            occupations = [1.0 if band < occupied else 0.0 for _ in range(ispin)]
+            f.write("{:5d}".format(band + 1) + "".join("{:16.6f}".format(e) for e in energies)
+                    + "".join("{:11.6f}".format(o) for o in occupations) + "\n")
+    f.write("\n")
+
+
+def wien2k_scf(f, iterations=40, atoms=4, seed=0):
+    """Write a Wien2k case.scf with ``iterations`` scf iterations"""
+    rng = random.Random(seed)
+    energy = -94844.0
+    for iteration in range(iterations):
+        f.write("\n:ITE{:03d}:{:3d}. ITERATION\n\n".format(iteration + 1, iteration + 1))
+        f.write("       SUBSTANCE: benchmark\n\n")
+        f.write(":NATO :{:5d} INDEPENDENT AND{:5d} TOTAL ATOMS IN UNITCELL\n".format(atoms, atoms))
+        f.write(":POT  : POTENTIAL OPTION  13 GGA-PBE\n")
+        f.write(":LAT  : LATTICE CONSTANTS=  10.26000 10.26000 10.26000\n")
+        f.write(":VOL  : UNIT CELL VOLUME =     270.01072\n")
+        f.write(":RKM  : MATRIX SIZE  1234LOs:  16 RKM= 7.00 WEIGHT= 2.00  PGR:\n")
+        f.write(":NOE  : NUMBER OF ELECTRONS          = {:7.3f}\n".format(14.0 * atoms))
+        f.write(":FER  : F E R M I - ENERGY(TETRAH.M.)={:15.10f}\n".format(rng.uniform(0.4, 0.5)))
+        gap = rng.uniform(0.03, 0.05)
+        f.write(":GAP (global)   :{:10.4f} Ry ={:10.3f} eV (accurate value if proper k-mesh)\n".format(gap, gap * 13.6057))
+        for atom in range(atoms):
+            f.write(":CTO{:03d}: TOTAL CHARGE IN SPHERE{:4d} = {:12.7f}\n".format(atom + 1, atom + 1, rng.uniform(10, 12)))
+        f.write(":NEC01: NUCLEAR AND ELECTRONIC CHARGE {:12.5f} {:12.5f} {:12.5f}\n".format(
+            14.0 * atoms, 14.0 * atoms - 1e-5, 1.0))
+        for atom in range(atoms):
+            f.write(":MMI{:03d}: MAGNETIC MOMENT IN SPHERE{:4d}    = {:10.5f}\n".format(atom + 1, atom + 1, rng.uniform(2, 2.5)))
+        f.write(":MMINT: MAGNETIC MOMENT IN INTERSTITIAL = {:10.5f}\n".format(rng.uniform(-0.1, 0)))
+        f.write(":MMTOT: TOTAL MAGNETIC MOMENT IN CELL = {:14.5f}\n".format(rng.uniform(8, 10)))
+        distance = 10.0 ** -(iteration % 7 + 1)
+        f.write(":DIS  :  CHARGE DISTANCE       ({:10.7f} for atom{:5d} spin 1){:15.7f}\n".format(
+            distance * 2, 1, distance))
+        f.write(":ENE  : ********** TOTAL ENERGY IN Ry ={:22.8f}\n\n".format(energy))
+        f.write("       TOTAL FORCE IN mRy/a.u. = |F|     Fx             Fy             Fz"
+                "     with/without FOR in case.in2\n")
+        for atom in range(atoms):
+            force = _vector(rng, 20)
+            f.write(":FOR{:03d}:{:4d}.ATOM {:14.3f} {:14.3f} {:14.3f} {:14.3f} partial forces\n".format(
+                atom + 1, atom + 1, sum(x * x for x in force) ** 0.5, *force))
+        for atom in range(atoms):
+            f.write(":FGL{:03d}:{:4d}.ATOM {:14.3f} {:14.3f} {:14.3f} total forces\n".format(
+                atom + 1, atom + 1, *_vector(rng, 20)))
+        f.write(":ENERGY convergence:  0 0.0001 {:.16f}\n".format(rng.uniform(0, 1e-3)))
+        f.write(":CHARGE convergence:  0 0.0001 {:.7f}\n".format(distance))
+        energy -= rng.uniform(0, 1e-3)
+
+
+def wien2k_optics(f, kind='epsilon', rows=100000, seed=0):
+    """Write a Wien2k optics table (``kind`` is 'epsilon', 'sigmak', 'absorp', 'refraction', 'reflectivity' or 'eloss')"""
+    rng = random.Random(seed)
+    title, columns = _OPTICS_HEADERS[kind]
+    f.write("#" + " " * 80 + "\n")
+    f.write("# Lorentzian broadening with gamma= 0.100000  [eV]\n")
+    f.write("# Im(epsilon) shifted by   0.0000   [eV]\n")
+    f.write("# No intraband contributions added\n#\n")
+    if title:
+        f.write("# {}\n#\n".format(title))
+    f.write("# Energy [eV] " + "".join("{:14s}".format(c) for c in columns) + "\n#\n")
+    for row in range(rows):
+        f.write("{:11.6f}".format(0.0136 * (row + 1))
+                + "".join("{:14.6E}".format(rng.uniform(0, 10)) for _ in columns) + "\n")
@@ -0,0 +1,200 @@
+"""Time every parser on synthetic inputs and report the results as JSON.
+
+Usage::
+
+    python -m benchmarks [--scale 1.0] [--repeat 3] [--only pwscf] [--output results.json]
+
+Each benchmark generates its input file once, then times the parser on it
+with :meth:`BlockParser.parse` over a text file and with
+:meth:`BlockParser.parse_file`.  Times are the best of ``--repeat`` runs; peak
+memory is measured with tracemalloc in a separate run, since tracing slows
+the parse down.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+from dftparse.pwscf.stdout_parser import PwscfStdOutputParser
+from dftparse.vasp.eigenval_parser import EigenvalParser
+from dftparse.vasp.outcar_parser import OutcarParser
+from dftparse.wien2k.absorp_parser import AbsorpParser
+from dftparse.wien2k.eloss_parser import ElossParser
+from dftparse.wien2k.epsilon_parser import EpsilonParser
+from dftparse.wien2k.reflectivity_parser import ReflectivityParser
+from dftparse.wien2k.refract_parser import RefractionParser
+from dftparse.wien2k.scf2_parser import Scf2Parser
+from dftparse.wien2k.scf_parser import ScfParser
+from dftparse.wien2k.sigmak_parser import SigmakParser
+
+from . import generators
+
+# (name, generator, generator arguments, argument scaled by --scale, parser class)
+BENCHMARKS = [
+    ('pwscf relax', generators.pwscf_stdout, {'steps': 200, 'calculation': 'relax'}, 'steps',
+     PwscfStdOutputParser),
+    ('pwscf vc-relax spin', generators.pwscf_stdout, {'steps': 100, 'calculation': 'vc-relax', 'nspin': 2},
+     'steps', PwscfStdOutputParser),
+    ('pwscf md', generators.pwscf_stdout,
+     {'steps': 1000, 'atoms': 32, 'kpoints': 1, 'calculation': 'md', 'verbosity': 'low'}, 'steps',
+     PwscfStdOutputParser),
+    ('outcar', generators.outcar, {'steps': 200, 'atoms': 32}, 'steps', OutcarParser),
+    ('eigenval', generators.eigenval, {'kpoints': 2000, 'bands': 64, 'ispin': 2}, 'kpoints', EigenvalParser),
+    ('wien2k scf', generators.wien2k_scf, {'iterations': 2000}, 'iterations', ScfParser),
+    ('wien2k scf2', generators.wien2k_scf, {'iterations': 2000}, 'iterations', Scf2Parser),
+    ('wien2k epsilon', generators.wien2k_optics, {'kind': 'epsilon', 'rows': 100000}, 'rows', EpsilonParser),
+    ('wien2k sigmak', generators.wien2k_optics, {'kind': 'sigmak', 'rows': 100000}, 'rows', SigmakParser),
+    ('wien2k absorp', generators.wien2k_optics, {'kind': 'absorp', 'rows': 100000}, 'rows', AbsorpParser),
+    ('wien2k refraction', generators.wien2k_optics, {'kind': 'refraction', 'rows': 100000}, 'rows',
+     RefractionParser),
+    ('wien2k reflectivity', generators.wien2k_optics, {'kind': 'reflectivity', 'rows': 100000}, 'rows',
+     ReflectivityParser),
+    ('wien2k eloss', generators.wien2k_optics, {'kind': 'eloss', 'rows': 100000}, 'rows', ElossParser),
+]
+
+
+def _parse(parser_class, path):
+    with open(path) as f:
+        return sum(1 for _ in parser_class().parse(f, sparse=True))
+
+
+def _parse_file(parser_class, path):
+    return sum(1 for _ in parser_class().parse_file(path, sparse=True))
+
+
+def _parse_file_arrays(parser_class, path):
+    arrays = parser_class().parse_file_arrays(path)
+    return len(next(iter(arrays.values())))
+
+
+def _parse_file_trajectory(parser_class, path):
+    trajectory = parser_class().parse_file_trajectory(path)
+    return len(next(iter(trajectory.values())))
+
+
+def _parse_file_bands(parser_class, path):
+    return sum(len(listing['energies']) for listing in parser_class().parse_file_bands(path))
+
+
+def _parse_file_scf_history(parser_class, path):
+    return sum(len(cycle['scf iteration']) for cycle in parser_class().parse_file_scf_history(path))
+
+
+def _parse_file_history(parser_class, path):
+    return len(parser_class().parse_file_history(path)['iteration'])
+
+
+# (name, function returning the number of blocks or array rows); methods other
+# than parse and parse_file are only run for the parsers that have them
+METHODS = [('parse', _parse), ('parse_file', _parse_file), ('parse_file_arrays', _parse_file_arrays),
+           ('parse_file_trajectory', _parse_file_trajectory), ('parse_file_bands', _parse_file_bands),
+           ('parse_file_scf_history', _parse_file_scf_history), ('parse_file_history', _parse_file_history)]
+
+
+def _count_lines(path):
+    with open(path, 'rb') as f:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+
+
+def _generate(directory, name, generator, kwargs):
+    path = os.path.join(directory, name.replace(' ', '_'))
+    with open(path, 'w') as f:
+        generator(f, **kwargs)
+    return path
+
+
+def measure(parser_class, path, method, repeat=3):
+    """Best time, blocks found and peak traced memory of parsing a file"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        blocks = method(parser_class, path)
+        best = min(best, perf_counter() - start)
+    tracemalloc.start()
+    try:
+        method(parser_class, path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, blocks, peak
+
+
+def run(scale=1.0, repeat=3, only=None, directory=None):
+    """Run the benchmarks whose names contain one of ``only`` (all of them if None)"""
+    results = []
+    temporary = directory is None
+    if temporary:
+        directory = tempfile.mkdtemp(prefix='dftparse-benchmarks-')
+    try:
+        for name, generator, kwargs, scaled, parser_class in BENCHMARKS:
+            if only and not any(o in name for o in only):
+                continue
+            kwargs = dict(kwargs)
+            kwargs[scaled] = max(1, int(kwargs[scaled] * scale))
+            path = _generate(directory, name, generator, kwargs)
+            size = os.path.getsize(path)
+            lines = _count_lines(path)
+            for method_name, method in METHODS:
+                if not hasattr(parser_class, method_name):
+                    continue
+                seconds, blocks, peak = measure(parser_class, path, method, repeat)
+                results.append({
+                    'benchmark': name,
+                    'parser': parser_class.__name__,
+                    'method': method_name,
+                    'parameters': kwargs,
+                    'bytes': size,
+                    'lines': lines,
+                    'blocks': blocks,
+                    'seconds': seconds,
+                    'lines/s': lines / seconds,
+                    'MB/s': size / seconds / 1e6,
+                    'peak memory': peak,
+                })
+    finally:
+        if temporary:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def _version():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return None
+    try:
+        return version('dftparse')
+    except PackageNotFoundError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier of every input size')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per measurement')
+    parser.add_argument('--only', action='append', help='run the benchmarks whose names contain this')
+    parser.add_argument('--directory', help='keep the generated inputs in this directory')
+    parser.add_argument('--output', default='-', help='file to write the JSON report to (default: stdout)')
+    args = parser.parse_args(argv)
+
+    if args.directory and not os.path.isdir(args.directory):
+        os.makedirs(args.directory)
+    report = {
+        'dftparse': _version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'results': run(args.scale, args.repeat, args.only, args.directory),
+    }
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
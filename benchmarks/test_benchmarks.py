@@ -0,0 +1,8 @@
+from benchmarks.run import BENCHMARKS, run
+
+
+def test_run():
+    """Test that every benchmark generates its input and times its parser on it"""
+    results = run(scale=0.01, repeat=1)
+    assert {result["benchmark"] for result in results} == {name for name, _, _, _, _ in BENCHMARKS}
+    assert all(result["blocks"] > 0 for result in results)
@@ -0,0 +1,108 @@
+"""NumPy helpers for the array output modes of the parsers.
+
+NumPy is an optional dependency of dftparse (``pip install dftparse[arrays]``);
+this module, and so the array modes, need it.
+"""
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("The array output modes of dftparse require NumPy: pip install dftparse[arrays]")
+
+
+def parse_floats(rows, columns=None):
+    """Convert rows of whitespace-separated numbers to a float64 array, with NumPy's C parser.
+
+    :param rows: iterable of strings
+    :param columns: number of values per row, to return a 2-D array; None for a flat one
+    :return: contiguous float64 array
+    """
+    rows = list(rows)
+    if not rows:
+        return np.empty(0 if columns is None else (0, columns))
+    values = np.loadtxt(rows, dtype=np.float64, ndmin=2)
+    if columns is None:
+        return values.ravel()
+    if values.shape[1] != columns:
+        raise ValueError("Expected {} values per row, got {}".format(columns, values.shape[1]))
+    return values
+
+
+def read_floats(pieces, count):
+    """Read ``count`` whitespace-separated numbers from pieces of text into a preallocated float64 array.
+
+    A number may be split across consecutive pieces; reading stops as soon as
+    the array is full, leaving the remaining pieces unread.
+
+    :param pieces: iterable of strings
+    :param count: number of values to read
+    :return: float64 array of shape (count,)
+    """
+    values = np.empty(count, dtype=np.float64)
+    filled = 0
+    tail = ''
+    for piece in pieces:
+        text = tail + piece
+        end = len(text)
+        while end and not text[end - 1].isspace():
+            end -= 1
+        tail = text[end:]
+        chunk = np.fromstring(text[:end], sep=' ')
+        n = min(len(chunk), count - filled)
+        values[filled:filled + n] = chunk[:n]
+        filled += n
+        if filled == count:
+            return values
+    if tail:
+        chunk = np.fromstring(tail, sep=' ')
+        n = min(len(chunk), count - filled)
+        values[filled:filled + n] = chunk[:n]
+        filled += n
+    if filled < count:
+        raise ValueError("Expected {} numbers, found {}".format(count, filled))
+    return values
+
+
+class GrowableArray(object):
+    """Float64 array growing along its first axis, with its capacity doubled whenever it is full.
+
+    The shape of the rows is taken from the first row appended, so rows of
+    unknown size (e.g. one per atom) can be collected.  Rows that are missing
+    are filled with NaN.
+    """
+
+    def __init__(self, capacity=16):
+        self._capacity = capacity
+        self._data = None
+        self._size = 0
+        # missing rows appended before the row shape was known
+        self._missing = 0
+
+    def __len__(self):
+        return self._size + self._missing
+
+    def append(self, row):
+        """Append a row"""
+        row = np.asarray(row, dtype=np.float64)
+        if self._data is None:
+            self._data = np.empty((max(self._capacity, 2 * self._missing),) + row.shape)
+            self._data[:self._missing] = np.nan
+            self._size, self._missing = self._missing, 0
+        if self._size == len(self._data):
+            data = np.empty((2 * len(self._data),) + self._data.shape[1:])
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size] = row
+        self._size += 1
+
+    def append_missing(self):
+        """Append a row of NaN"""
+        if self._data is None:
+            self._missing += 1
+        else:
+            self.append(np.nan)
+
+    def array(self):
+        """The rows appended so far (a view, valid until the next append), or None if all are missing"""
+        if self._data is None:
+            return None
+        return self._data[:self._size]
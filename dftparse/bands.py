@@ -0,0 +1,157 @@
+"""Band edges, gaps and Fermi levels from parsed eigenvalues (requires NumPy).
+
+The functions work on the arrays of :meth:`EigenvalParser.parse_arrays`:
+energies and occupancies of shape (nk, nbands, nspin) and k-point weights of
+shape (nk,).  Every quantity is computed per spin channel, with vectorised
+operations over all k-points and bands at once.
+"""
+from .arrays import np
+
+
+def kpoint_arrays(kpoints):
+    """Stack the k-point dicts of :meth:`EigenvalParser.parse` into the arrays of parse_arrays"""
+    kpoints = [kpoint for kpoint in kpoints if kpoint]
+    res = {
+        "kpoints": np.array([kpoint["kpoint"] for kpoint in kpoints], dtype=np.float64).reshape(-1, 3),
+        "weights": np.array([kpoint["weight"] for kpoint in kpoints], dtype=np.float64),
+        "energies": np.array([kpoint["energies"] for kpoint in kpoints], dtype=np.float64),
+    }
+    if kpoints and "occupancies" in kpoints[0]:
+        res["occupancies"] = np.array([kpoint["occupancies"] for kpoint in kpoints], dtype=np.float64)
+    return res
+
+
+def _normalized_weights(weights, nk):
+    if weights is None:
+        return np.full(nk, 1.0 / nk)
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+
+def occupied_states(energies, occupancies=None, fermi_level=None, threshold=0.5):
+    """Boolean mask of the occupied states, of the shape of ``energies``.
+
+    :param energies: array (nk, nbands, nspin)
+    :param occupancies: array of the same shape; states are occupied above ``threshold``
+    :param fermi_level: used instead of occupancies when there are none: states
+        at or below it are occupied; a scalar, or one level per spin
+    """
+    energies = np.asarray(energies, dtype=np.float64)
+    if occupancies is not None:
+        return np.asarray(occupancies) > threshold
+    if fermi_level is None:
+        raise ValueError("Either occupancies or a Fermi level is needed to tell occupied states")
+    return energies <= np.asarray(fermi_level, dtype=np.float64)
+
+
+def fermi_level(energies, occupancies, weights=None):
+    """Fermi level of each spin channel, from filling the states with the electrons the occupancies hold.
+
+    The states are filled in order of energy, each holding the weight of its
+    k-point, until they hold as many electrons as the weighted occupancies.
+    The Fermi level is the energy of the state filled last; when the last
+    state is filled exactly, as in an insulator, it is placed half way to the
+    next state.
+
+    :param energies: array (nk, nbands, nspin)
+    :param occupancies: array (nk, nbands, nspin), partial occupancies allowed
+    :param weights: k-point weights (nk,); uniform if None
+    :return: array (nspin,)
+    """
+    energies = np.asarray(energies, dtype=np.float64)
+    nk, nbands, nspin = energies.shape
+    w = _normalized_weights(weights, nk)
+    # (nk * nbands, nspin) arrays of the states, sorted by energy in each channel
+    flat = energies.reshape(nk * nbands, nspin)
+    order = np.argsort(flat, axis=0, kind='stable')
+    sorted_energies = np.take_along_axis(flat, order, axis=0)
+    capacity = np.repeat(w, nbands)[order]
+    filled = np.cumsum(capacity, axis=0)
+    electrons = np.einsum('k,kbs->s', w, np.asarray(occupancies, dtype=np.float64))
+
+    tolerance = 1e-6
+    last = np.argmax(filled >= (electrons - tolerance)[np.newaxis, :], axis=0)
+    channels = np.arange(nspin)
+    level = sorted_energies[last, channels]
+    exact = np.abs(filled[last, channels] - electrons) <= tolerance
+    has_next = last + 1 < len(flat)
+    following = sorted_energies[np.minimum(last + 1, len(flat) - 1), channels]
+    midgap = exact & has_next
+    level[midgap] = (level[midgap] + following[midgap]) / 2
+    level[electrons <= tolerance] = np.nan
+    return level
+
+
+def band_edges(energies, occupancies=None, weights=None, fermi_level=None, threshold=0.5, partial=0.05):
+    """Band edges and gaps of each spin channel.
+
+    States count as occupied as for :func:`occupied_states`.  A channel is
+    metallic if a band is occupied at some k-points of non-zero weight and
+    empty at others, as a band crossing the Fermi level is, if an occupied
+    state lies above an unoccupied one, or if any state is partially
+    occupied, between ``partial`` and ``1 - partial``, all at k-points of
+    non-zero weight; its gaps are then zero.
+
+    :param energies: array (nk, nbands, nspin)
+    :param occupancies: array (nk, nbands, nspin), or None to use ``fermi_level``
+    :param weights: k-point weights (nk,); only used to ignore zero-weight
+        k-points, which do not count electrons, when telling metals
+    :return: dict of arrays of shape (nspin,): "vbm", "cbm", "band gap",
+        "direct gap", "vbm k-point index", "cbm k-point index",
+        "direct gap k-point index", "is direct" and "is metal"; plus the
+        scalar "band gap (all spins)" between the highest occupied and lowest
+        unoccupied state of either spin
+    """
+    energies = np.asarray(energies, dtype=np.float64)
+    nk, nbands, nspin = energies.shape
+    occupied = occupied_states(energies, occupancies, fermi_level, threshold)
+
+    occupied_energies = np.where(occupied, energies, -np.inf)
+    empty_energies = np.where(occupied, np.inf, energies)
+    # highest occupied and lowest unoccupied state of every k-point, (nk, nspin)
+    top = occupied_energies.max(axis=1)
+    bottom = empty_energies.min(axis=1)
+
+    vbm_k = top.argmax(axis=0)
+    cbm_k = bottom.argmin(axis=0)
+    channels = np.arange(nspin)
+    vbm = top[vbm_k, channels]
+    cbm = bottom[cbm_k, channels]
+    direct = bottom - top
+    direct_k = direct.argmin(axis=0)
+    direct_gap = direct[direct_k, channels]
+
+    counted = np.ones(nk, dtype=bool) if weights is None else np.asarray(weights) > 0
+    # bands occupied at some counted k-points and empty at others, ignoring missing (NaN) energies
+    filled = occupied[counted]
+    empty = ~filled & np.isfinite(energies[counted])
+    metal = (filled.any(axis=0) & empty.any(axis=0)).any(axis=0)
+    # an occupied state above an unoccupied one, again only at counted k-points
+    highest = np.where(counted[:, None], top, -np.inf).max(axis=0)
+    lowest = np.where(counted[:, None], bottom, np.inf).min(axis=0)
+    metal |= lowest <= highest
+    if occupancies is not None:
+        occupancies = np.asarray(occupancies, dtype=np.float64)
+        fractional = (occupancies > partial) & (occupancies < 1 - partial)
+        metal |= fractional[counted].any(axis=(0, 1))
+    with np.errstate(invalid='ignore'):
+        gap = np.where(metal, 0.0, cbm - vbm)
+    direct_gap = np.where(metal, 0.0, direct_gap)
+
+    overall = cbm.min() - vbm.max()
+    if metal.any():
+        overall = 0.0
+    elif not np.isfinite(overall):
+        overall = np.nan
+    return {
+        "vbm": np.where(np.isfinite(vbm), vbm, np.nan),
+        "cbm": np.where(np.isfinite(cbm), cbm, np.nan),
+        "band gap": np.where(np.isfinite(gap), gap, np.nan),
+        "direct gap": np.where(np.isfinite(direct_gap), direct_gap, np.nan),
+        "vbm k-point index": vbm_k,
+        "cbm k-point index": cbm_k,
+        "direct gap k-point index": direct_k,
+        "is direct": ~metal & np.isclose(direct_gap, gap),
+        "is metal": metal,
+        "band gap (all spins)": overall,
+    }
@@ -0,0 +1,38 @@
+"""Parse many files with one parser class, in a process pool."""
+import traceback
+from collections import namedtuple
+from multiprocessing import Pool
+
+BatchResult = namedtuple('BatchResult', ['path', 'blocks', 'error'])
+BatchResult.__doc__ = """Outcome for one file: its blocks, or the formatted traceback of the failure"""
+
+
+def _parse_path(task):
+    parser_class, path, sparse, encoding = task
+    try:
+        blocks = list(parser_class().parse_file(path, sparse=sparse, encoding=encoding))
+    except Exception:
+        return BatchResult(path, None, traceback.format_exc())
+    return BatchResult(path, blocks, None)
+
+
+def parse_many(paths, parser_class, processes=None, chunksize=1, ordered=True, sparse=False, encoding='utf-8'):
+    """Parse files in a process pool, yielding a :class:`BatchResult` per file.
+
+    A file that fails to parse is reported through the ``error`` field of its
+    result and does not stop the batch.
+
+    :param paths: iterable of file paths
+    :param parser_class: BlockParser subclass, instantiated with no arguments in each worker
+    :param processes: number of worker processes (None for one per CPU)
+    :param chunksize: number of files handed to a worker at a time
+    :param ordered: yield results in input order, rather than as files complete
+    :param sparse: passed on to :meth:`BlockParser.parse_file`
+    :param encoding: passed on to :meth:`BlockParser.parse_file`
+    :return: generator of BatchResult
+    """
+    tasks = ((parser_class, path, sparse, encoding) for path in paths)
+    with Pool(processes) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for result in imap(_parse_path, tasks, chunksize):
+            yield result
@@ -0,0 +1,206 @@
+"""Persistent on-disk cache of parse results."""
+import hashlib
+import os
+import pickle
+import tempfile
+import types
+from functools import partial
+
+
+def _code_digest(code, namespace, digest, seen):
+    """Feed a code object, and the module-level functions it refers to, into a digest"""
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_digest(const, namespace, digest, seen)
+        else:
+            digest.update(repr(const).encode())
+    for name in code.co_names:
+        value = namespace.get(name)
+        if isinstance(value, types.FunctionType) and value not in seen:
+            _callable_digest(value, digest, seen)
+
+
+def _value_digest(value, digest, seen):
+    """Feed a value bound to an extractor into a digest: functions by their code, anything else by its repr"""
+    if isinstance(value, (types.FunctionType, partial)):
+        if value not in seen:
+            _callable_digest(value, digest, seen)
+    elif isinstance(value, (tuple, list)):
+        digest.update(type(value).__name__.encode())
+        for item in value:
+            _value_digest(item, digest, seen)
+    else:
+        digest.update(repr(value).encode())
+
+
+def _callable_digest(value, digest, seen):
+    seen.add(value)
+    if isinstance(value, partial):
+        _value_digest(value.args, digest, seen)
+        _value_digest(sorted(value.keywords.items()), digest, seen)
+        value = value.func
+    code = getattr(value, '__code__', None)
+    if code is None:
+        digest.update(repr(type(value)).encode())
+        return
+    digest.update('{}.{}'.format(value.__module__, value.__qualname__).encode())
+    _code_digest(code, value.__globals__, digest, seen)
+    # values bound to the function rather than written in its code
+    _value_digest(value.__defaults__, digest, seen)
+    _value_digest(sorted((value.__kwdefaults__ or {}).items()), digest, seen)
+    for cell in value.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:  # an empty cell
+            contents = None
+        _value_digest(contents, digest, seen)
+
+
+def rules_fingerprint(rules):
+    """Digest of a rule set, changing with its triggers, its extractors' code and bound values, and its declared keys"""
+    digest = hashlib.sha256()
+    seen = set()
+    for rule in rules:
+        trigger = rule[0]
+        if hasattr(trigger, 'search'):
+            digest.update(repr((trigger.pattern, trigger.flags)).encode())
+        elif callable(trigger):
+            _callable_digest(trigger, digest, seen)
+        else:
+            digest.update(repr(trigger).encode())
+        _callable_digest(rule[1], digest, seen)
+        digest.update(repr(rule[2:]).encode())
+    return digest.hexdigest()
+
+
+class ParseCache(object):
+    """Cache of :meth:`BlockParser.parse_file` results, stored as pickles in a directory.
+
+    Entries are keyed by the file's path, size and modification time (or its
+    content hash, with ``hash_content=True``), the parser class, a fingerprint
+    of its rules and the parse options, so editing a rule invalidates the
+    entries it produced.  The directory is kept under ``max_size`` bytes by
+    evicting the least recently used entries.  Entries are written atomically,
+    so several processes can share a cache directory.
+
+    The size of the directory is tallied when the first entry is written and
+    kept up to date with the entries written since, so the directory is only
+    walked again when the tally goes over ``max_size``; entries written by
+    other processes sharing it are counted from then on.
+    """
+
+    def __init__(self, directory, max_size=1 << 30, hash_content=False):
+        self.directory = directory
+        self.max_size = max_size
+        self.hash_content = hash_content
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # bytes in the directory as of the last walk, plus those written since; None before the first walk
+        self._size = None
+
+    def _file_fingerprint(self, path):
+        if self.hash_content:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def key(self, parser, path, **kwargs):
+        """Cache key for parsing a file with a parser and options"""
+        parser_class = type(parser)
+        parts = (
+            os.path.realpath(path),
+            self._file_fingerprint(path),
+            '{}.{}'.format(parser_class.__module__, parser_class.__qualname__),
+            rules_fingerprint(parser.rules),
+            sorted(kwargs.items()),
+        )
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pickle')
+
+    def parse_file(self, parser, path, **kwargs):
+        """Parse a file with :meth:`BlockParser.parse_file`, or load the results of an earlier parse.
+
+        :param parser: BlockParser to parse with
+        :param path: file to parse
+        :param kwargs: options passed on to parse_file, which are part of the key
+        :return: list of the parse results
+        """
+        entry = self._entry(self.key(parser, path, **kwargs))
+        try:
+            with open(entry, 'rb') as f:
+                results = pickle.load(f)
+        except Exception:
+            # no entry, or a corrupt or truncated one, which unpickling can fail on in many ways
+            pass
+        else:
+            try:
+                os.utime(entry, None)
+            except OSError:
+                pass
+            return results
+
+        results = list(parser.parse_file(path, **kwargs))
+        self._store(entry, results)
+        return results
+
+    def _store(self, entry, results):
+        directory = os.path.dirname(entry)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        try:
+            replaced = os.path.getsize(entry)
+        except OSError:
+            replaced = 0
+        fd, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            os.replace(temp, entry)
+        except BaseException:
+            os.remove(temp)
+            raise
+        if self._size is None or self._size + size - replaced > self.max_size:
+            self.evict()
+        else:
+            self._size += size - replaced
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_size"""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith('.pickle'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._size = total
+
+    def clear(self):
+        """Remove every entry"""
+        max_size, self.max_size = self.max_size, -1
+        try:
+            self.evict()
+        finally:
+            self.max_size = max_size
@@ -0,0 +1,138 @@
+"""Streaming decompression of compressed inputs, detected by their magic bytes."""
+import bz2
+import gzip
+import io
+import lzma
+import os
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# (leading bytes, format name), longest first; bzip2 streams start with "BZh" and their block size, 1 to 9
+MAGIC = (
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+) + tuple((b'BZh' + str(level).encode(), 'bz2') for level in range(1, 10)) + (
+    (b'\x1f\x8b', 'gzip'),
+)
+_MAGIC_LENGTH = max(len(magic) for magic, _ in MAGIC)
+
+
+def detect_compression(head):
+    """Name of the compression format of data starting with ``head``, or None if it is not compressed"""
+    for magic, name in MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def is_compressed(path):
+    """Whether the file at a path is compressed in a supported format"""
+    with open(path, 'rb') as f:
+        return detect_compression(f.read(_MAGIC_LENGTH)) is not None
+
+
+class _PrefixedReader(io.RawIOBase):
+    """Binary stream of bytes already read from a stream, followed by the rest of it"""
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.prefix:
+            n = min(len(b), len(self.prefix))
+            b[:n] = self.prefix[:n]
+            self.prefix = self.prefix[n:]
+            return n
+        data = self.stream.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def _peek(stream):
+    """The leading bytes of a binary stream, and a stream that still starts with them"""
+    if hasattr(stream, 'peek'):
+        return stream.peek(_MAGIC_LENGTH)[:_MAGIC_LENGTH], stream
+    if stream.seekable():
+        position = stream.tell()
+        head = stream.read(_MAGIC_LENGTH)
+        stream.seek(position)
+        return head, stream
+    head = stream.read(_MAGIC_LENGTH)
+    return head, _PrefixedReader(head, stream)
+
+
+def _decompressed(stream, compression):
+    """Binary stream of the decompressed content of a stream (not closing it)"""
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(stream, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(stream, mode='rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("Reading zstd-compressed input requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(stream, closefd=False)
+    return stream
+
+
+@contextmanager
+def open_decompressed(source):
+    """Binary stream of the content of a path or binary file object, decompressed if need be.
+
+    The compression format is detected from the leading bytes, whatever the
+    file name.  A file object passed in is left open.
+    """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, 'rb') as f:
+            head, stream = _peek(f)
+            with _decompressed(stream, detect_compression(head)) as decompressed:
+                yield decompressed
+        return
+    head, stream = _peek(source)
+    compression = detect_compression(head)
+    if compression is None:
+        yield stream
+        return
+    with _decompressed(stream, compression) as decompressed:
+        yield decompressed
+
+
+def iter_lines(source, encoding='utf-8', block_size=1 << 20):
+    """Lines of a path or file object, decompressed and decoded in blocks of ``block_size`` bytes.
+
+    Lines are decoded as :meth:`BlockParser.parse_file` decodes them: with
+    undecodable bytes replaced and ``\\r\\n`` line endings turned into
+    ``\\n``.  Only one block is held in memory at a time, so memory stays
+    bounded whatever the size of the input.  Text file objects are passed
+    through as they are.
+    """
+    if isinstance(source, io.TextIOBase):
+        for line in source:
+            yield line
+        return
+    with open_decompressed(source) as stream:
+        tail = b''
+        while True:
+            block = stream.read(block_size)
+            if not block:
+                break
+            block = tail + block
+            end = block.rfind(b'\n') + 1
+            tail = block[end:]
+            if not end:
+                continue
+            lines = block[:end].decode(encoding, 'replace').replace('\r\n', '\n').split('\n')
+            lines.pop()
+            for line in lines:
+                yield line + '\n'
+        if tail:
+            yield tail.decode(encoding, 'replace')
@@ -1,12 +1,544 @@
 """Base parser class."""
+import asyncio
+import io
+import mmap
+import os
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import chain, islice
+from multiprocessing import Pool
+
+from .compression import is_compressed, iter_lines
+
+Match = namedtuple('Match', ['line_number', 'rule', 'block'])
+Match.__doc__ = """A block produced by a rule, tagged with the (1-based) number of its trigger line"""
+
+
+def rule_name(rule):
+    """Name of a rule, taken from its extractor"""
+    extract = rule[1]
+    return getattr(extract, '__name__', None) or repr(extract)
+
+
+def rule_keys(rule):
+    """Keys a rule declares it can produce, or None if it does not say"""
+    return rule[2] if len(rule) > 2 else None
+
+
+def peek(lines, count=1):
+    """The next ``count`` lines of an extractor's ``lines``, or fewer at the end of the input, without consuming them.
+
+    The lines a :class:`BlockParser` hands to extractors are given back to
+    the rules after the block, so a block can look at the lines after it,
+    e.g. for an optional section, without swallowing the next block's
+    trigger.  From other iterators, the lines are consumed.
+    """
+    method = getattr(lines, 'peek', None)
+    if method is not None:
+        return method(count)
+    return list(islice(lines, count))
+
+
+def _select_rules(rules, keys):
+    """Rules that can produce any of the keys: those declaring one, and those declaring none"""
+    keys = set(keys)
+    return [rule for rule in rules if rule_keys(rule) is None or keys.intersection(rule_keys(rule))]
+
+
+def _trie_pattern(literals):
+    """Build a regular expression matching any of the literals.
+
+    Common prefixes are factored out, so the regex engine tries at most one
+    branch per character instead of every literal at every position.
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def _build(node):
+        optional = '' in node
+        branches = [re.escape(char) + _build(node[char]) for char in sorted(node) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return '(?:{}){}'.format('|'.join(branches), '?' if optional else '')
+
+    return _build(trie)
+
+
+# an inline flag, e.g. "(?i)" or "(?s-i:", which cannot be moved into a combined pattern
+_INLINE_FLAGS = re.compile(r'\(\?(?:[aiLmsux]+(?:-[imsx]+)?|-[imsx]+)[:)]')
+
+
+def _foldable(pattern):
+    """Whether a pattern can be joined with others into one without changing what it matches.
+
+    Groups would be renumbered or, if named, clash; inline flags must start
+    the expression; and in verbose patterns a trailing comment would swallow
+    the closing parenthesis.
+    """
+    return (isinstance(pattern.pattern, str) and pattern.groups == 0 and not pattern.flags & re.VERBOSE
+            and not _INLINE_FLAGS.search(pattern.pattern))
+
+
+def _literal_test(literals):
+    if len(literals) == 1:
+        literal = literals[0]
+        return lambda line: literal in line
+    return lambda line: any(literal in line for literal in literals)
+
+
+class _Dispatch(object):
+    """Select the first rule, in order, whose trigger matches a line.
+
+    Literal and regular expression triggers are folded into one combined
+    pattern per set of regex flags, so a line that matches none of them is
+    rejected with a single search.  Callable triggers, and regular expressions
+    that cannot be folded (see :func:`_foldable`), are opaque and are still
+    tried on every line.
+    """
+
+    def __init__(self, rules, profile=None):
+        self.profile = profile
+        self.tests = []
+        self.opaque = []
+        literals = []
+        patterns = {}
+        for index, rule in enumerate(rules):
+            trigger = rule[0]
+            if isinstance(trigger, str):
+                trigger = (trigger,)
+            if hasattr(trigger, 'search'):
+                if _foldable(trigger):
+                    patterns.setdefault(trigger.flags, []).append(trigger.pattern)
+                else:
+                    self.opaque.append(index)
+                test = trigger.search
+            elif isinstance(trigger, (tuple, list, set, frozenset)):
+                trigger = tuple(trigger)
+                literals.extend(trigger)
+                test = _literal_test(trigger)
+            elif callable(trigger):
+                self.opaque.append(index)
+                test = trigger
+            else:
+                raise TypeError("Unsupported rule trigger: {!r}".format(trigger))
+            if profile is not None:
+                test = profile.wrap_test(rule, test)
+            self.tests.append(test)
+
+        self.scanners = []
+        if literals:
+            self.scanners.append(re.compile(_trie_pattern(literals)))
+        for flags, sources in patterns.items():
+            self.scanners.append(re.compile('|'.join('(?:{})'.format(s) for s in sources), flags))
+        self._searches = [self._wrap_search(scanner.search) for scanner in self.scanners]
+
+    def _wrap_search(self, search):
+        return search if self.profile is None else self.profile.wrap_search(search)
+
+    def byte_searches(self, encoding):
+        """Search functions of the combined trigger patterns, compiled for encoded bytes"""
+        # MULTILINE keeps anchors tied to line boundaries when searching a whole buffer
+        return [
+            self._wrap_search(re.compile(
+                scanner.pattern.encode(encoding), (scanner.flags & ~re.UNICODE) | re.MULTILINE).search)
+            for scanner in self.scanners
+        ]
+
+    def first(self, line):
+        """Index of the first rule whose trigger matches the line, or None"""
+        for index, test in enumerate(self.tests):
+            if test(line):
+                return index
+        return None
+
+    def match(self, line):
+        """Index of the rule to apply to the line, or None"""
+        for search in self._searches:
+            if search(line):
+                return self.first(line)
+        for index in self.opaque:
+            if self.tests[index](line):
+                return index
+        return None
+
+
+class _CountingIterator(object):
+    """Iterator wrapper counting the items pulled through it.
+
+    Items :meth:`peek` pulls from an iterator that cannot peek itself are kept
+    in ``pending`` until they are read, for the caller to take back if not.
+    """
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.count = 0
+        self.pending = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self.pending.pop(0) if self.pending else next(self.iterator)
+        self.count += 1
+        return item
+
+    def peek(self, count=1):
+        if hasattr(self.iterator, 'peek'):
+            return self.iterator.peek(count)
+        while len(self.pending) < count:
+            try:
+                self.pending.append(next(self.iterator))
+            except StopIteration:
+                break
+        return self.pending[:count]
+
+
+class _NeedMoreLines(Exception):
+    """Raised when an extractor runs past the lines received so far, but not past the input"""
+
+
+class _BufferedLines(object):
+    """Iterator over a list of lines from a position, for input that is still arriving"""
+
+    def __init__(self, buffer, position, exhausted):
+        self.buffer = buffer
+        self.position = position
+        self.exhausted = exhausted
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position >= len(self.buffer):
+            if self.exhausted:
+                raise StopIteration
+            raise _NeedMoreLines()
+        line = self.buffer[self.position]
+        self.position += 1
+        return line
+
+    def peek(self, count=1):
+        lines = self.buffer[self.position:self.position + count]
+        if len(lines) < count and not self.exhausted:
+            raise _NeedMoreLines()
+        return lines
+
+
+def _decode(raw, encoding):
+    line = raw.decode(encoding, 'replace')
+    if line.endswith('\r\n'):
+        line = line[:-2] + '\n'
+    return line
+
+
+def _line_end(buf, position, end):
+    """Offset just past the line starting at position"""
+    stop = buf.find(b'\n', position, end)
+    return end if stop < 0 else stop + 1
+
+
+def _count_lines(buf, start, stop, window=1 << 24):
+    """Number of lines starting in buf[start:stop], where start and stop are line starts or EOF"""
+    count = 0
+    for position in range(start, stop, window):
+        count += buf[position:min(position + window, stop)].count(b'\n')
+    if stop > start and stop == len(buf) and buf[stop - 1:stop] != b'\n':
+        count += 1
+    return count
+
+
+class _MappedLines(object):
+    """Iterator decoding the lines of a byte buffer from a given offset.
+
+    With ``partial``, the buffer holds the data received so far and running
+    out of it raises :class:`_NeedMoreLines` instead of ending the iteration.
+    """
+
+    def __init__(self, buf, position, end, encoding, partial=False):
+        self.buf = buf
+        self.position = position
+        self.end = end
+        self.encoding = encoding
+        self.partial = partial
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = self.position
+        if start >= self.end:
+            if self.partial:
+                raise _NeedMoreLines()
+            raise StopIteration
+        self.position = _line_end(self.buf, start, self.end)
+        return _decode(self.buf[start:self.position], self.encoding)
+
+    def peek(self, count=1):
+        lines = []
+        position = self.position
+        while len(lines) < count and position < self.end:
+            line_end = _line_end(self.buf, position, self.end)
+            lines.append(_decode(self.buf[position:line_end], self.encoding))
+            position = line_end
+        if len(lines) < count and self.partial:
+            raise _NeedMoreLines()
+        return lines
+
+
+def _scan_mapped(buf, rules, dispatch, encoding, start=0, limit=None, end=None, partial=False):
+    """Apply the rules to the lines of a byte buffer.
+
+    Yields ``(line_start, resume, index, block)`` for every line starting in
+    ``buf[start:limit]`` that a rule fires on, where ``resume`` is the offset
+    just past the last line the extractor consumed.  Extractors may read past
+    ``limit``, up to ``end``, at which point they see the end of the input, or
+    with ``partial`` raise :class:`_NeedMoreLines`.  Without opaque triggers,
+    only lines around hits of the combined trigger patterns are ever decoded.
+    """
+    end = len(buf) if end is None else end
+    limit = end if limit is None else limit
+    position = start
+
+    if dispatch.opaque:
+        while position < limit:
+            line_end = _line_end(buf, position, end)
+            line = _decode(buf[position:line_end], encoding)
+            index = dispatch.match(line)
+            if index is None:
+                position = line_end
+                continue
+            lines = _MappedLines(buf, line_end, end, encoding, partial)
+            block = rules[index][1](line, lines)
+            yield position, lines.position, index, block
+            position = lines.position
+        return
+
+    searches = dispatch.byte_searches(encoding)
+    hits = [search(buf, position) for search in searches]
+    while True:
+        found = [hit.start() for hit in hits if hit is not None]
+        if not found:
+            return
+        hit = min(found)
+        line_start = max(buf.rfind(b'\n', position, hit) + 1, position)
+        if line_start >= limit:
+            return
+        line_end = _line_end(buf, hit, end)
+        line = _decode(buf[line_start:line_end], encoding)
+        index = dispatch.first(line)
+        if index is None:
+            position = line_end
+        else:
+            lines = _MappedLines(buf, line_end, end, encoding, partial)
+            block = rules[index][1](line, lines)
+            yield line_start, lines.position, index, block
+            position = lines.position
+        hits = [
+            hit if hit is None or hit.start() >= position else search(buf, position)
+            for hit, search in zip(hits, searches)
+        ]
+
+
+def _chunk_bounds(buf, chunk_size):
+    """Offsets splitting a buffer into ranges of about chunk_size bytes, on line starts"""
+    bounds = [0]
+    while bounds[-1] < len(buf):
+        approx = bounds[-1] + chunk_size
+        bounds.append(len(buf) if approx >= len(buf) else _line_end(buf, approx - 1, len(buf)))
+    return bounds
+
+
+def _scan_chunk(task):
+    """Scan one byte range of a file, in a worker process"""
+    rules, path, encoding, start, limit = task
+    dispatch = _Dispatch(rules)
+    hits = []
+    scanned_to = limit
+    with _mapped(path) as buf:
+        try:
+            for hit in _scan_mapped(buf, rules, dispatch, encoding, start, limit):
+                hits.append(hit)
+        except Exception:
+            # Possibly a spurious trigger inside a block owned by the previous
+            # range; the merge rescans from here and re-raises if it is genuine
+            scanned_to = hits[-1][1] if hits else start
+    return start, limit, scanned_to, hits
+
+
+def _merge_chunks(buf, rules, dispatch, encoding, chunks):
+    """Merge per-range scans into the hits a sequential scan would produce.
+
+    A range is scanned from its first line, so its first hits may fall inside a
+    block that an extractor of the previous range consumed: those are dropped.
+    The lines such a dropped block covered past the sequential resume offset
+    were never examined, so they are rescanned here, as are ranges whose scan
+    failed.
+    """
+    position = 0
+    unexamined = 0
+    for start, limit, scanned_to, hits in chunks:
+        for line_start, resume, index, block in hits:
+            if unexamined > position:
+                stop = min(unexamined, line_start)
+                for hit in _scan_mapped(buf, rules, dispatch, encoding, position, stop):
+                    yield hit
+                    position = hit[1]
+                position = max(position, stop)
+            if line_start < position:
+                unexamined = max(unexamined, resume)
+                continue
+            yield line_start, resume, index, block
+            position = resume
+        if scanned_to < limit:
+            unexamined = max(unexamined, limit)
+    if unexamined > position:
+        for hit in _scan_mapped(buf, rules, dispatch, encoding, position, unexamined):
+            yield hit
+
+
+def _scan_mapped_first(buf, rules, keys, encoding, profile=None):
+    """Scan a buffer until each of the keys has been produced once.
+
+    A rule retires once all the requested keys it declares have been found,
+    and the scan restarts from the current offset with the remaining rules.
+    Hits are yielded as by :func:`_scan_mapped`, with indices into ``rules``.
+    """
+    remaining = set(keys)
+    active = list(range(len(rules)))
+    position = 0
+    while remaining and active:
+        subset = [rules[i] for i in active]
+        for line_start, resume, index, block in _scan_mapped(buf, subset, _Dispatch(subset, profile), encoding, position):
+            yield line_start, resume, active[index], block
+            position = resume
+            found = remaining.intersection(block or ())
+            if found:
+                remaining -= found
+                active = [i for i in active if _still_needed(rules[i], remaining)]
+                break
+        else:
+            return
+
+
+def _still_needed(rule, remaining):
+    keys = rule_keys(rule)
+    return keys is None or bool(remaining.intersection(keys))
+
+
+def _trigger_lines(buf, dispatch, encoding, start, end):
+    """Offsets of the lines in buf[start:end] that may fire a rule, from the last one back"""
+    if dispatch.opaque:
+        offsets = []
+        position = start
+        while position < end:
+            offsets.append(position)
+            position = _line_end(buf, position, end)
+        return offsets[::-1]
+    offsets = set()
+    for search in dispatch.byte_searches(encoding):
+        position = start
+        hit = search(buf, position, end)
+        while hit is not None:
+            offsets.add(max(buf.rfind(b'\n', start, hit.start()) + 1, start))
+            position = _line_end(buf, hit.start(), end)
+            hit = search(buf, position, end)
+    return sorted(offsets, reverse=True)
+
+
+def _scan_mapped_last(buf, rules, keys, encoding, block_size=1 << 20, profile=None):
+    """Find the last block of each rule, searching a buffer backwards from its end.
+
+    The buffer is searched in windows of about ``block_size`` bytes on line
+    boundaries, starting from the end; the lines of a window that a rule
+    fires on are tried from the last one back, and the extractor is run
+    forwards from there.  A block cut off by the end of the buffer is skipped
+    in favour of the previous one.  A rule retires once it has produced a
+    block, or with ``keys``, once all the requested keys it declares have been
+    found.
+
+    :return: list of hits as yielded by :func:`_scan_mapped`, from the last one
+        back, and the offset down to which the buffer was searched
+    """
+    hits = []
+    remaining = None if keys is None else set(keys)
+    dispatch = _Dispatch(rules, profile)
+    active = list(range(len(rules)))
+    end = len(buf)
+    while active and end > 0:
+        start = 0 if end <= block_size else buf.rfind(b'\n', 0, end - block_size) + 1
+        searching = _Dispatch([rules[i] for i in active], profile)
+        for line_start in _trigger_lines(buf, searching, encoding, start, end):
+            line_end = _line_end(buf, line_start, end)
+            line = _decode(buf[line_start:line_end], encoding)
+            index = dispatch.first(line)
+            if index not in active:
+                continue
+            lines = _MappedLines(buf, line_end, len(buf), encoding)
+            try:
+                block = rules[index][1](line, lines)
+            except StopIteration:
+                continue
+            hits.append((line_start, lines.position, index, block))
+            if remaining is None:
+                active.remove(index)
+            else:
+                remaining -= set(block or ())
+                active = [i for i in active if remaining and _still_needed(rules[i], remaining)]
+            if not active:
+                break
+        end = start
+    return hits, end
+
+
+@contextmanager
+def _mapped(path):
+    """Read-only memory map of a file (an empty buffer for an empty file)"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield buf
+    finally:
+        buf.close()
+
+
+def _record_mapped_input(buf, hits, profile, to_end):
+    """Pass hits through, recording the size of the buffer they were scanned from"""
+    position = 0
+    for hit in hits:
+        yield hit
+        position = hit[1]
+    if to_end:
+        position = len(buf)
+    profile.record_input(_count_lines(buf, 0, position), position)
 
 
 class BlockParser(object):
-    """Parser built on rules that parse blocks of input."""
+    """Parser built on rules that parse blocks of input.
+
+    Each rule is a ``(trigger, extract)`` pair.  The trigger is either a
+    literal string, a tuple of literal strings (any of which triggers), a
+    compiled regular expression, or a predicate callable on the line.  The
+    first rule whose trigger matches a line is applied by calling
+    ``extract(line, lines)``, which may pull further lines from ``lines``, or
+    look at them with :func:`peek`.  Literal and regex triggers are checked with one combined search per line,
+    so prefer them to predicates whenever possible.
+    """
 
     def __init__(self, rules=[]):
         """Create a BlockParser, pre-loading a set of rules."""
         self.rules = []
+        # set to a dftparse.instrument.ParseProfile to record per-rule statistics
+        self.profile = None
         for rule in rules:
             self.add_rule(rule)
 
@@ -14,13 +546,341 @@ class BlockParser(object):
         """Add a rule to this parser"""
         self.rules.append(rule)
 
-    def parse(self, generator):
-        """Parse an iterable source of strings into a generator."""
+    def _prepare(self, keys=None):
+        """The rules to apply, selected by keys and instrumented when profiling"""
+        rules = list(self.rules)
+        if keys is not None:
+            rules = _select_rules(rules, keys)
+        if self.profile is not None:
+            rules = self.profile.instrument(rules)
+        return rules
+
+    def _sub_parser(self, rules):
+        """A parser of other rules, e.g. those of an array output, that records into this parser's profile"""
+        parser = BlockParser(rules)
+        parser.profile = self.profile
+        return parser
+
+    def parse(self, generator, sparse=False, keys=None, first=False):
+        """Parse an iterable source of strings into a generator.
+
+        By default one block is yielded per line that is not consumed by a
+        rule, empty if no rule matched it.  With ``sparse=True`` only the
+        blocks of matching rules are yielded, as :class:`Match` tuples.
+
+        With ``keys``, rules that declare the keys they produce (as a third
+        element) and produce none of the requested ones are not applied.  With
+        ``first=True`` as well, each requested key is produced only once, and
+        parsing stops as soon as all of them have been found.
+
+        A binary file object is decompressed (see :mod:`dftparse.compression`)
+        and decoded as UTF-8; use :meth:`parse_file` for other encodings.
+        """
+        rules = self._prepare(keys)
+        if isinstance(generator, (io.BufferedIOBase, io.RawIOBase)):
+            generator = iter_lines(generator)
         gen = iter(generator)
-        for line in gen:
-            block = {}
-            for rule in self.rules:
-                if rule[0](line):
-                    block = rule[1](line, gen)
+        if self.profile is not None:
+            gen = self.profile.count_input(gen)
+        if first:
+            if keys is None:
+                raise ValueError("Parsing only first occurrences requires keys")
+            return self._parse_first(gen, rules, keys, sparse, self.profile)
+        match = _Dispatch(rules, self.profile).match
+        if sparse:
+            return self._parse_sparse(gen, rules, match)
+        return self._parse_dense(gen, rules, match)
+
+    def parse_file(self, path, sparse=False, encoding='utf-8', processes=1, chunk_size=1 << 26,
+                   keys=None, first=False):
+        """Parse a file into a generator, as :meth:`parse` would its lines.
+
+        The file is memory-mapped and searched for rule triggers directly in
+        its bytes; only lines around a hit are decoded and handed to the rules.
+        The encoding must be ASCII-compatible.  ``keys`` and ``first`` select
+        rules as for :meth:`parse`; stopping early, only the head of the file
+        is ever read.
+
+        With ``processes`` other than 1 (``None`` for one per CPU), files
+        larger than ``chunk_size`` bytes are split into ranges on line
+        boundaries that are scanned in a process pool, and the blocks are
+        merged back in file order.  Blocks that straddle a range boundary are
+        reconciled, so the output is the same as a sequential parse.  The
+        rules must be picklable.  Parsing for ``first`` occurrences is always
+        sequential, and when profiling, only the work done in this process is
+        recorded.
+
+        Compressed files (gzip, bzip2, xz, and zstd if the zstandard package is
+        installed) are recognised by their leading bytes and decompressed in a
+        stream, as are file objects, which are parsed as by :meth:`parse`; they
+        are always parsed sequentially.
+        """
+        # checked here rather than in the generator, to fail on the call as parse does
+        if first and keys is None:
+            raise ValueError("Parsing only first occurrences requires keys")
+        if not isinstance(path, (str, bytes, os.PathLike)) or is_compressed(path):
+            return self.parse(iter_lines(path, encoding), sparse, keys, first)
+        return self._parse_file(path, sparse, encoding, processes, chunk_size, keys, first)
+
+    def _parse_file(self, path, sparse, encoding, processes, chunk_size, keys, first):
+        rules = self._prepare(keys)
+        dispatch = _Dispatch(rules, self.profile)
+        with _mapped(path) as buf:
+            if first:
+                hits = _scan_mapped_first(buf, rules, keys, encoding, self.profile)
+                for item in self._emit_mapped(buf, rules, hits, sparse, self.profile, trailing=False):
+                    yield item
+                return
+            if processes == 1 or len(buf) <= chunk_size:
+                hits = _scan_mapped(buf, rules, dispatch, encoding)
+                for item in self._emit_mapped(buf, rules, hits, sparse, self.profile):
+                    yield item
+                return
+            bounds = _chunk_bounds(buf, chunk_size)
+            # workers apply the plain rules: instrumented ones cannot be pickled
+            plain = list(self.rules) if keys is None else _select_rules(self.rules, keys)
+            tasks = [(plain, path, encoding, start, limit) for start, limit in zip(bounds, bounds[1:])]
+            with Pool(processes) as pool:
+                chunks = pool.imap(_scan_chunk, tasks)
+                hits = _merge_chunks(buf, rules, dispatch, encoding, chunks)
+                for item in self._emit_mapped(buf, rules, hits, sparse, self.profile):
+                    yield item
+
+    def parse_last(self, path, keys=None, encoding='utf-8', block_size=1 << 20):
+        """Parse the last occurrence of each rule's block in a file, searching it backwards.
+
+        The file is memory-mapped and searched for triggers from its end, in
+        blocks of ``block_size`` bytes, and each rule is applied from its last
+        trigger line; a block cut off by the end of the file, as by a running
+        calculation, is skipped for the one before it.  The search stops as
+        soon as every rule, or with ``keys`` every requested key, has been
+        found, so the final values of a long run are found by reading only its
+        tail.  Triggers are found by line, so a trigger inside a block that a
+        forward parse would consume as part of an earlier block is not told
+        apart.  Compressed files and file objects cannot be searched backwards
+        and are parsed forwards instead, as by :meth:`parse`.
+
+        :param path: file to parse
+        :param keys: keys to find, selecting rules as for :meth:`parse`; None for all
+        :param encoding: passed on as for :meth:`parse_file`
+        :param block_size: number of bytes searched at a time
+        :return: dict of the last value of each key produced, by the last block
+            of each rule when ``keys`` is None
+        """
+        rules = self._prepare(keys)
+        res = {}
+        if not isinstance(path, (str, bytes, os.PathLike)) or is_compressed(path):
+            for match in self.parse(iter_lines(path, encoding), sparse=True, keys=keys):
+                res.update((key, value) for key, value in (match.block or {}).items()
+                           if keys is None or key in keys)
+            return res
+        with _mapped(path) as buf:
+            hits, searched_from = _scan_mapped_last(buf, rules, keys, encoding, block_size, self.profile)
+            if self.profile is not None:
+                self.profile.record_input(_count_lines(buf, searched_from, len(buf)), len(buf) - searched_from)
+        for line_start, resume, index, block in hits:
+            for key, value in (block or {}).items():
+                if keys is None or key in keys:
+                    res.setdefault(key, value)
+        return res
+
+    def follow(self, path, checkpoint=None, encoding='utf-8'):
+        """Parse the part of a growing file appended since the last call.
+
+        Only complete lines are parsed.  When a block is cut off by the end of
+        the data written so far, parsing stops before it and the block is
+        parsed from its trigger line on the next call.
+
+        :param path: file to follow, e.g. the stdout of a running calculation
+        :param checkpoint: checkpoint returned by the previous call, or None to start from the top
+        :param encoding: passed on as for :meth:`parse_file`
+        :return: list of the new :class:`Match` blocks, and a JSON-serialisable checkpoint
+            to pass to the next call; the file is parsed from the top again if it was
+            replaced or truncated in between
+        """
+        rules = self._prepare()
+        dispatch = _Dispatch(rules, self.profile)
+        names = [rule_name(rule) for rule in rules]
+        checkpoint = checkpoint or {}
+        matches = []
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+        identity = [stat.st_dev, stat.st_ino]
+        with _mapped(path) as buf:
+            position = checkpoint.get('offset', 0)
+            lines_before = checkpoint.get('line_number', 0)
+            if checkpoint.get('file') != identity or position > len(buf):
+                position, lines_before = 0, 0
+            start = position
+            end = buf.rfind(b'\n') + 1
+            try:
+                for line_start, resume, index, block in _scan_mapped(
+                        buf, rules, dispatch, encoding, position, end, end, partial=True):
+                    lines_before += _count_lines(buf, position, line_start)
+                    matches.append(Match(lines_before + 1, names[index], block))
+                    lines_before += _count_lines(buf, line_start, resume)
+                    position = resume
+                lines_before += _count_lines(buf, position, end)
+                position = end
+            except _NeedMoreLines:
+                pass
+            if self.profile is not None:
+                self.profile.record_input(_count_lines(buf, start, position), position - start)
+        return matches, {'file': identity, 'offset': position, 'line_number': lines_before}
+
+    @staticmethod
+    def _emit_mapped(buf, rules, hits, sparse, profile=None, trailing=True):
+        """Turn the hits of a buffer scan into the output of :meth:`parse`"""
+        if profile is not None:
+            hits = _record_mapped_input(buf, hits, profile, trailing)
+        position = 0
+        if sparse:
+            names = [rule_name(rule) for rule in rules]
+            line_number = 1
+            for line_start, resume, index, block in hits:
+                line_number += _count_lines(buf, position, line_start)
+                yield Match(line_number, names[index], block)
+                line_number += _count_lines(buf, line_start, resume)
+                position = resume
+        else:
+            for line_start, resume, index, block in hits:
+                for _ in range(_count_lines(buf, position, line_start)):
+                    yield {}
+                yield block
+                position = resume
+            if trailing:
+                for _ in range(_count_lines(buf, position, len(buf))):
+                    yield {}
+
+    async def parse_async(self, lines, sparse=False, yield_every=1000):
+        """Parse an async iterable source of strings into an async generator.
+
+        The output is the same as that of :meth:`parse`.  Lines are buffered
+        as they arrive; when an extractor runs past the buffer, it is re-run
+        from its trigger line once more lines have arrived, so extractors
+        must not have side effects.  Control is handed back to the event loop
+        at least every ``yield_every`` lines, even if the source never waits.
+        """
+        rules = self._prepare()
+        match = _Dispatch(rules, self.profile).match
+        names = [rule_name(rule) for rule in rules]
+        profile = self.profile
+        source = lines.__aiter__()
+        buffer = []
+        head = 0
+        exhausted = False
+        line_number = 0
+
+        async def _fill(count):
+            nonlocal exhausted
+            for _ in range(count):
+                try:
+                    line = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    return
+                buffer.append(line)
+                if profile is not None:
+                    profile.record_input(1, len(line))
+
+        while True:
+            if head >= len(buffer):
+                if exhausted:
+                    return
+                if head > 0:
+                    del buffer[:head]
+                    head = 0
+                await _fill(1)
+                continue
+            line = buffer[head]
+            line_number += 1
+            if line_number % yield_every == 0:
+                await asyncio.sleep(0)
+            index = match(line)
+            if index is None:
+                head += 1
+                if not sparse:
+                    yield {}
+                continue
+            while True:
+                following = _BufferedLines(buffer, head + 1, exhausted)
+                try:
+                    block = rules[index][1](line, following)
+                    break
+                except _NeedMoreLines:
+                    # fetch geometrically more lines, so long blocks are re-run only a few times
+                    await _fill(max(len(buffer) - head, 1))
+            consumed = following.position - head - 1
+            head = following.position
+            if sparse:
+                yield Match(line_number, names[index], block)
+            else:
+                yield block
+            line_number += consumed
+
+    @staticmethod
+    def _parse_dense(gen, rules, match):
+        while gen is not None:
+            source, gen = gen, None
+            for line in source:
+                index = match(line)
+                if index is None:
+                    yield {}
+                    continue
+                lines = _CountingIterator(source)
+                yield rules[index][1](line, lines)
+                if lines.pending:
+                    # the lines the extractor peeked at go back to the rules
+                    gen = chain(lines.pending, source)
+                    break
+
+    @staticmethod
+    def _parse_sparse(gen, rules, match):
+        names = [rule_name(rule) for rule in rules]
+        line_number = 0
+        while gen is not None:
+            source, gen = gen, None
+            for line in source:
+                line_number += 1
+                index = match(line)
+                if index is not None:
+                    lines = _CountingIterator(source)
+                    block = rules[index][1](line, lines)
+                    yield Match(line_number, names[index], block)
+                    line_number += lines.count
+                    if lines.pending:
+                        gen = chain(lines.pending, source)
+                        break
+
+    @staticmethod
+    def _parse_first(gen, rules, keys, sparse, profile=None):
+        remaining = set(keys)
+        names = [rule_name(rule) for rule in rules]
+        active = list(range(len(rules)))
+        match = _Dispatch(rules, profile).match
+        line_number = 0
+        while gen is not None:
+            source, gen = gen, None
+            for line in source:
+                line_number += 1
+                index = match(line)
+                if index is None:
+                    if not sparse:
+                        yield {}
+                    continue
+                index = active[index]
+                lines = _CountingIterator(source)
+                block = rules[index][1](line, lines)
+                yield Match(line_number, names[index], block) if sparse else block
+                line_number += lines.count
+
+                found = remaining.intersection(block or ())
+                if found:
+                    remaining -= found
+                    if not remaining:
+                        return
+                    active = [i for i in active if _still_needed(rules[i], remaining)]
+                    match = _Dispatch([rules[i] for i in active], profile).match
+                if lines.pending:
+                    gen = chain(lines.pending, source)
                     break
-            yield block
@@ -0,0 +1,480 @@
+"""Array rules and ionic trajectory assembly for the standard output of PWscf (requires NumPy)."""
+import re
+
+from ..arrays import GrowableArray, np, parse_floats
+from ..core import peek
+from .stdout_parser import _kpoints_keys, _parse_kpoints_summary
+from .stdout_parser import _parse_forces as _parse_forces_lists
+from .stdout_parser import _parse_kpoints_block as _parse_kpoints_lists
+from .stdout_parser import _parse_stress_and_pressure as _parse_stress_lists
+from .stdout_parser import _parse_lattice_parameter, _parse_total_energy, base_rules
+
+# headers of the tables of contributions to the forces, and their keys
+_FORCE_CONTRIBUTIONS = (
+    ('non-local contrib.', 'non-local contribution to forces'),
+    ('ionic contribution', 'ionic contribution to forces'),
+    ('local contribution', 'local contribution to forces'),
+    ('core correction contribution', 'core corrections to forces'),
+    ('Hubbard contrib.', 'Hubbard contribution to forces'),
+    ('SCF correction term', 'SCF correction term to forces'),
+)
+
+
+def _contribution_key(line):
+    for header, key in _FORCE_CONTRIBUTIONS:
+        if header in line:
+            return key
+    return None
+
+
+def _force_table(rows):
+    """Parse the force vectors of the ``atom ... force =`` lines of a table into an (natoms, 3) array"""
+    values = np.fromstring(' '.join([row.partition('=')[2] for row in rows]), sep=' ')
+    if len(values) != 3 * len(rows):
+        raise ValueError("Expected 3 force components per atom, got {} for {} atoms".format(len(values), len(rows)))
+    return values.reshape(-1, 3)
+
+
+def _parse_forces(line, lines):
+    """Parse the forces block into (natoms, 3) arrays of the total forces and of each contribution.
+
+    The keys are those of the list rule, with the same aliases: contributions
+    that are not printed are (0, 3) arrays, as they are empty lists there.
+    """
+    units = line.split()[-1].rstrip('):').lstrip('(')
+    next(lines)
+    tables = {'atomic forces': []}
+    rows = tables['atomic forces']
+    newline = next(lines)
+    while newline.split():
+        if '=' in newline:
+            rows.append(newline)
+        else:
+            key = _contribution_key(newline)
+            if key is not None:
+                rows = tables.setdefault(key, [])
+        newline = next(lines)
+    toks = next(lines).split()
+
+    total = tables['atomic forces']
+    species = np.array([int(row.split(None, 4)[3]) for row in total])
+    forces = _force_table(total)
+    res = {
+        'force units': units,
+        'forces': forces,
+        'atomic forces': forces,
+        'Atomic species index for forces': species,
+        'atomic species index for forces': species,
+        'total force': float(toks[3]),
+        'total SCF correction': float(toks[8]),
+    }
+    for _, key in _FORCE_CONTRIBUTIONS:
+        res[key] = _force_table(tables.get(key, []))
+    return res
+
+
+def _parse_stress_and_pressure(line, lines):
+    """Parse the stress in kbar, the last three columns of the next three lines, into a (3, 3) array"""
+    return {
+        'pressure': float(line.strip().rpartition('=')[2]),
+        'pressure units': 'kbar',
+        'stress': parse_floats([next(lines) for _ in range(3)], 6)[:, 3:],
+        'stress units': 'kbar',
+    }
+
+
+_KPOINT_PUNCTUATION = str.maketrans('(),=', '    ')
+
+
+def _kpoint_listing(lines, nkpoints):
+    """Parse ``nkpoints`` lines of ``k( n) = ( x y z), wk = w`` into (nk, 3) coordinates and (nk,) weights"""
+    text = ' '.join([next(lines).partition('=')[2] for _ in range(nkpoints)])
+    values = np.fromstring(text.replace('wk', ' ').translate(_KPOINT_PUNCTUATION), sep=' ')
+    if len(values) != 4 * nkpoints:
+        raise ValueError("Expected {} values for {} k-points, got {}".format(4 * nkpoints, nkpoints, len(values)))
+    values = values.reshape(nkpoints, 4)
+    return np.ascontiguousarray(values[:, :3]), values[:, 3].copy()
+
+
+def _parse_kpoints_block(line, lines):
+    """Parse the k-points and their weights into arrays, with the listing in crystal coordinates if printed.
+
+    The crystal coordinates, printed with high verbosity, follow the
+    cartesian ones after a blank line; the two lines after the listing are
+    peeked at to look for them, and left to the other rules if they are not.
+    """
+    res = _parse_kpoints_summary(line)
+    nkpoints = res['number of k-points']
+    newline = next(lines)
+    # if # k-points > 100 they aren't printed when verbosity is `low`
+    if not newline.strip() and 'print them' in next(lines):
+        return res
+    res['k-points coordinate system'] = newline.strip()
+    res['list of k-points'], res['list of k-point weights'] = _kpoint_listing(lines, nkpoints)
+    following = peek(lines, 2)
+    if len(following) < 2 or following[0].strip() or 'cryst. coord.' not in following[1]:
+        return res
+    next(lines)
+    next(lines)
+    res['list of k-points in crystal coordinates'] = _kpoint_listing(lines, nkpoints)[0]
+    return res
+
+
+# a minus sign right after a digit: numbers printed in fixed width that have run together
+_GLUED = re.compile(r'(?<=\d)-')
+
+
+def _floats(text):
+    """Parse whitespace-separated numbers, also those that fixed-width formats have run together"""
+    if _GLUED.search(text):
+        text = _GLUED.sub(' -', text)
+    count = len(text.split())
+    if not count:
+        # np.fromstring reads blank text as [-1.]
+        return np.empty(0)
+    # NumPy 1.x stops at the first token that is not a number, with only a warning
+    values = np.fromstring(text, sep=' ')
+    if len(values) != count:
+        raise ValueError("Expected {} numbers, got {}".format(count, len(values)))
+    return values
+
+
+def _number_rows(lines):
+    """Join the lines of numbers up to the next blank line or the end of the output, skipping blank lines before them"""
+    rows = []
+    for newline in lines:
+        if newline.strip():
+            rows.append(newline)
+        elif rows:
+            break
+    return ' '.join(rows)
+
+
+def _parse_band_energies(line, lines):
+    """Parse the k-point and the band energies of one ``bands (ev)`` listing"""
+    return {
+        'k-point': _floats(line.partition('=')[2].partition('(')[0]),
+        'band energies': _floats(_number_rows(lines)),
+    }
+
+
+def _parse_occupation_numbers(line, lines):
+    return {'occupation numbers': _floats(_number_rows(lines))}
+
+
+def _parse_spin_channel(line, lines):
+    return {'spin channel': 'down' if 'DOWN' in line else 'up'}
+
+
+def _parse_end_of_calculation(line, lines):
+    return {'end of calculation': line.strip()[len('End of '):]}
+
+
+_forces_keys = ('force units', 'forces', 'atomic forces', 'Atomic species index for forces',
+                'atomic species index for forces', 'total force',
+                'total SCF correction') + tuple(key for _, key in _FORCE_CONTRIBUTIONS)
+
+_ARRAY_RULES = {
+    _parse_kpoints_lists: ('number of k points=', _parse_kpoints_block,
+                           _kpoints_keys + ('list of k-points in crystal coordinates',)),
+    _parse_forces_lists: ('Forces acting on atoms', _parse_forces, _forces_keys),
+    _parse_stress_lists: ('total   stress', _parse_stress_and_pressure,
+                          ('pressure', 'pressure units', 'stress', 'stress units')),
+}
+
+# Rules of the band energies and occupations listed after each calculation, for every k-point and spin
+band_rules = [
+    (('bands (ev)', 'band energies (ev)'), _parse_band_energies, ('k-point', 'band energies')),
+    ('occupation numbers', _parse_occupation_numbers, ('occupation numbers',)),
+    (('------ SPIN UP', '------ SPIN DOWN'), _parse_spin_channel, ('spin channel',)),
+    (('End of self-consistent calculation', 'End of band structure calculation'), _parse_end_of_calculation,
+     ('end of calculation',)),
+]
+
+# The rules of PwscfStdOutputParser, with k-points, forces and stress parsed into float64 arrays, and the bands
+array_rules = [_ARRAY_RULES.get(rule[1], rule) for rule in base_rules] + band_rules
+
+
+def _padded(rows, shape):
+    """Rows of a channel in an array of the given shape, NaN where they are missing or short"""
+    array = np.full(shape, np.nan)
+    for k, row in enumerate(rows):
+        array[k, :len(row)] = row
+    return array
+
+
+def _band_listing(kpoints, energies, occupancies):
+    """Stack the rows of one listing into arrays of shape (nk, nbands, nspin).
+
+    The k-points of a listing cut off by the end of the output, as that of a
+    running calculation, are listed for spin up but not all for spin down;
+    their missing rows are NaN.
+    """
+    nspin = 2 if energies['down'] else 1
+    channels = ('up', 'down')[:nspin]
+    shape = (len(kpoints), max(len(row) for channel in channels for row in energies[channel]))
+    listing = {
+        'kpoints': np.array(kpoints, dtype=np.float64).reshape(-1, 3),
+        'energies': np.stack([_padded(energies[channel], shape) for channel in channels], axis=-1),
+    }
+    if all(len(occupancies[channel]) == len(energies[channel]) for channel in channels):
+        listing['occupancies'] = np.stack([_padded(occupancies[channel], shape) for channel in channels], axis=-1)
+    return listing
+
+
+def assemble_bands(blocks):
+    """Group the blocks of the band rules into one set of arrays per listing.
+
+    Each self-consistent or band structure calculation lists the band
+    energies of every k-point, first for spin up and then for spin down in
+    spin-polarised runs, with the occupation numbers when the verbosity is
+    high.  The arrays have the layout of :meth:`EigenvalParser.parse_arrays`,
+    so they can be passed to :mod:`dftparse.bands`.
+
+    :param blocks: iterable of the dicts produced by :data:`band_rules`
+    :return: list of dicts, one per listing in the order of the output, of
+        float64 arrays: "kpoints" (nk, 3) in cartesian coordinates in units of
+        2pi/alat, "energies" (nk, nbands, nspin) in eV and, if listed for
+        every k-point, "occupancies" (nk, nbands, nspin)
+    """
+    listings = []
+    kpoints = None
+    channel = 'up'
+    for block in blocks:
+        if 'end of calculation' in block:
+            if kpoints:
+                listings.append(_band_listing(kpoints, energies, occupancies))
+            kpoints = None
+        if kpoints is None:
+            kpoints, energies, occupancies = [], {'up': [], 'down': []}, {'up': [], 'down': []}
+            channel = 'up'
+        if 'spin channel' in block:
+            channel = block['spin channel']
+        if 'band energies' in block:
+            if channel == 'up':
+                kpoints.append(block['k-point'])
+            energies[channel].append(block['band energies'])
+        if 'occupation numbers' in block:
+            occupancies[channel].append(block['occupation numbers'])
+    if kpoints:
+        listings.append(_band_listing(kpoints, energies, occupancies))
+    return listings
+
+
+BOHR = 0.52917721067  # in angstrom
+
+
+def _units(line):
+    """Units given in parentheses or braces on a card line, e.g. "alat= 10.2" for ``CELL_PARAMETERS (alat= 10.2)``"""
+    match = re.search(r'[({]\s*([^)}]*?)\s*[)}]', line)
+    return match.group(1) if match else None
+
+
+def _parse_crystal_axes(line, lines):
+    """Parse the cell vectors of the header, in units of alat"""
+    rows = [next(lines).partition('=')[2].replace('(', ' ').replace(')', ' ') for _ in range(3)]
+    return {'cell vectors': parse_floats(rows, 3), 'cell vectors units': 'alat'}
+
+
+def _parse_cell_parameters(line, lines):
+    """Parse a CELL_PARAMETERS card, along with the lattice parameter it gives"""
+    res = {'cell vectors': parse_floats([next(lines) for _ in range(3)], 3)}
+    units = _units(line) or 'alat'
+    if units.startswith('alat='):
+        res['lattice parameter'] = float(units[5:])
+        units = 'alat'
+    res['cell vectors units'] = units
+    return res
+
+
+def _parse_initial_positions(line, lines):
+    """Parse the ``tau( n) = ( x y z )`` lines of the header into an (natoms, 3) array.
+
+    With high verbosity the positions are listed in units of alat, then again in crystal coordinates.
+    """
+    units = line.partition('(')[2].split()[0]
+    if units == 'cryst.':
+        units = 'crystal'
+    rows = []
+    newline = next(lines)
+    while newline.split():
+        rows.append(newline.partition('=')[2].replace('(', ' ').replace(')', ' '))
+        newline = next(lines)
+    return {'positions': parse_floats(rows, 3), 'positions units': units}
+
+
+def _parse_positions_card(line, lines):
+    """Parse an ATOMIC_POSITIONS card into an (natoms, 3) array, ignoring any fixed-coordinate flags"""
+    rows = []
+    newline = next(lines).split()
+    while len(newline) >= 4:
+        rows.append(newline[1:4])
+        newline = next(lines).split()
+    return {'positions': np.array(rows, dtype=np.float64).reshape(-1, 3), 'positions units': _units(line) or 'alat'}
+
+
+def _to_angstrom(values, units, alat, cell):
+    """Convert positions or cell vectors to cartesian coordinates in angstrom"""
+    if units == 'angstrom':
+        return values
+    if units == 'bohr':
+        return values * BOHR
+    if units == 'alat':
+        if alat is None:
+            raise ValueError("Coordinates in units of alat are given before the lattice parameter")
+        return values * (alat * BOHR)
+    if units == 'crystal':
+        if cell is None:
+            raise ValueError("Crystal coordinates are given before the cell vectors")
+        return values @ cell
+    raise ValueError("Unsupported coordinate units: {}".format(units))
+
+
+# Rules of the geometry, energy, forces and stress of each ionic step
+trajectory_rules = [
+    ('lattice parameter', _parse_lattice_parameter, ('lattice parameter', 'lattice parameter units')),
+    ('crystal axes:', _parse_crystal_axes, ('cell vectors', 'cell vectors units')),
+    ('CELL_PARAMETERS ', _parse_cell_parameters, ('cell vectors', 'cell vectors units', 'lattice parameter')),
+    ('atom                  pos', _parse_initial_positions, ('positions', 'positions units')),
+    ('ATOMIC_POSITIONS', _parse_positions_card, ('positions', 'positions units')),
+    ('!    total energy', _parse_total_energy, ('total energy', 'total energy units')),
+    ('Forces acting on atoms', _parse_forces, _forces_keys),
+    ('total   stress', _parse_stress_and_pressure, ('pressure', 'pressure units', 'stress', 'stress units')),
+]
+
+TRAJECTORY_KEYS = ("total energy", "positions", "forces", "cell vectors", "stress")
+
+
+def _append_step(columns, step):
+    for key, column in columns.items():
+        if step.get(key) is None:
+            column.append_missing()
+        else:
+            column.append(step[key])
+
+
+def assemble_trajectory(blocks):
+    """Group the blocks of the trajectory rules into ionic steps, stored column by column.
+
+    A step starts with its self-consistent total energy, and is followed by
+    its forces and stress.  Its positions and cell vectors are the last ones
+    printed before the energy: the header's for the first step, then those
+    of each new geometry.  Quantities a step does not print are NaN.
+
+    :param blocks: iterable of the dicts produced by :data:`trajectory_rules`
+    :return: dict of float64 arrays: "total energy" (nsteps,) in Ry, "positions"
+        (nsteps, natoms, 3) in angstrom, "forces" (nsteps, natoms, 3) in Ry/au,
+        "cell vectors" (nsteps, 3, 3) in angstrom, one vector per row, and
+        "stress" (nsteps, 3, 3) in kbar; quantities never printed are left out
+    """
+    columns = {key: GrowableArray() for key in TRAJECTORY_KEYS}
+    alat = cell = positions = None
+    step = None
+    for block in blocks:
+        alat = block.get('lattice parameter', alat)
+        if 'cell vectors' in block:
+            cell = _to_angstrom(block['cell vectors'], block['cell vectors units'], alat, cell)
+        if 'positions' in block:
+            positions = _to_angstrom(block['positions'], block['positions units'], alat, cell)
+        if 'total energy' in block:
+            if step is not None:
+                _append_step(columns, step)
+            step = {'total energy': block['total energy'], 'positions': positions, 'cell vectors': cell}
+        elif step is not None:
+            if 'atomic forces' in block:
+                step['forces'] = block['atomic forces']
+            if 'stress' in block:
+                step['stress'] = block['stress']
+    if step is not None:
+        _append_step(columns, step)
+
+    trajectory = {}
+    for key, column in columns.items():
+        array = column.array()
+        if array is not None:
+            trajectory[key] = array
+    return trajectory
+
+
+def _parse_scf_iteration(line, lines):
+    return {'scf iteration': int(line.partition('#')[2].split()[0])}
+
+
+def _parse_scf_total_energy(line, lines):
+    return {'scf iteration total energy': float(line.partition('=')[2].split()[0])}
+
+
+def _parse_scf_accuracy(line, lines):
+    return {'estimated scf accuracy': float(line.partition('<')[2].split()[0])}
+
+
+def _parse_cpu_time(line, lines):
+    return {'total cpu time spent': float(line.split()[-2])}
+
+
+# Rules of the convergence of every SCF iteration; the converged iteration prints its energy with a "!"
+scf_rules = [
+    (re.compile(r'^\s*iteration #'), _parse_scf_iteration, ('scf iteration',)),
+    (re.compile(r'^[\s!]*total energy\s+='), _parse_scf_total_energy, ('scf iteration total energy',)),
+    ('estimated scf accuracy', _parse_scf_accuracy, ('estimated scf accuracy',)),
+    ('total cpu time spent up to now', _parse_cpu_time, ('total cpu time spent',)),
+]
+
+SCF_HISTORY_KEYS = ('scf iteration', 'scf iteration total energy', 'estimated scf accuracy', 'total cpu time spent')
+
+
+class ScfHistory(object):
+    """Convergence history of the SCF cycles of a PWscf run, stored column by column.
+
+    Blocks of :data:`scf_rules` are added as they are parsed, so the history
+    can be kept up to date while a calculation runs, e.g. with the matches
+    that :meth:`BlockParser.follow` returns for a parser of these rules.  An
+    iteration takes the first energy, accuracy and CPU time printed after its
+    ``iteration #`` line, and a cycle ends where the iteration count starts
+    over.
+    """
+
+    def __init__(self):
+        self._finished = []
+        self._current = None
+        self._last_iteration = None
+
+    def add(self, block):
+        """Add a block of the SCF rules"""
+        if 'scf iteration' in block:
+            iteration = block['scf iteration']
+            if self._current is None or iteration <= self._last_iteration:
+                if self._current is not None:
+                    self._finished.append(self._columns(self._current))
+                self._current = GrowableArray()
+            self._current.append([iteration] + [np.nan] * (len(SCF_HISTORY_KEYS) - 1))
+            self._last_iteration = iteration
+        elif self._current is not None:
+            row = self._current.array()[-1]
+            for column, key in enumerate(SCF_HISTORY_KEYS):
+                if key in block and np.isnan(row[column]):
+                    row[column] = block[key]
+
+    def extend(self, blocks):
+        """Add the blocks of an iterable"""
+        for block in blocks:
+            self.add(block)
+
+    @staticmethod
+    def _columns(rows):
+        values = rows.array().copy()
+        res = {key: values[:, column] for column, key in enumerate(SCF_HISTORY_KEYS)}
+        res['scf iteration'] = res['scf iteration'].astype(np.int64)
+        return res
+
+    def cycles(self):
+        """The cycles so far, the last one possibly still running.
+
+        :return: list of dicts, one per cycle, of arrays with one value per
+            iteration: "scf iteration" (int64), "scf iteration total energy"
+            in Ry, "estimated scf accuracy" in Ry and "total cpu time spent"
+            in seconds; values that were not printed are NaN
+        """
+        if self._current is None:
+            return list(self._finished)
+        return self._finished + [self._columns(self._current)]
@@ -1,4 +1,6 @@
 import os
+import re
+from functools import partial
 
 from dftparse.core import BlockParser
 
@@ -156,7 +158,7 @@ def _parse_xc(line, lines):
     }
 
 
-def _parse_kpoints_block(line, lines):
+def _parse_kpoints_summary(line):
     toks = line.strip().split()
     results = {
         'number of k-points': int(toks[4]),
@@ -168,6 +170,11 @@ def _parse_kpoints_block(line, lines):
         if 'width' in tok:
             results['smearing width'] = float(toks[ind+2])
             results['smearing width units'] = 'Ry'
+    return results
+
+
+def _parse_kpoints_block(line, lines):
+    results = _parse_kpoints_summary(line)
 
     newline = next(lines)
     # if # k-points > 100 they aren't printed when verbosity is `low`
@@ -180,8 +187,9 @@ def _parse_kpoints_block(line, lines):
     results['list of k-point weights'] = []
     for i in range(results['number of k-points']):
         newline = next(lines)
-        toks = newline.strip().split()
-        kpoints = list(map(float, [t.strip('),') for t in toks[4:7]]))
+        # from 10000 on, the index fills "k(10000)" and is no longer split off
+        toks = newline.partition('=')[2].replace('(', ' ').split()
+        kpoints = list(map(float, [t.strip('),') for t in toks[0:3]]))
         results['list of k-points'].append(kpoints)
         results['list of k-point weights'].append(float(toks[-1]))
     return results
@@ -203,14 +211,21 @@ def _parse_total_energy(line, lines):
     }
 
 
+def _parse_energy_contrib(name, line, lines):
+    toks = line.partition('=')[2].split()
+    return {
+        '{} energy contribution'.format(name): float(toks[0]),
+        '{} energy contribution units'.format(name): toks[1]
+    }
+
+
 def _gen_energy_contrib(name):
-    def _extract(line, lines):
-        toks = line.partition('=')[2].split()
-        return {
-            '{} energy contribution'.format(name): float(toks[0]),
-            '{} energy contribution units'.format(name): toks[1]
-        }
-    return (lambda x: '{} contrib'.format(name) in x, _extract)
+    # a partial of a module-level function, so that the rules can be pickled
+    _extract = partial(_parse_energy_contrib, name)
+    _extract.__name__ = '_parse_{}_energy_contrib'.format(name.replace('-', '_'))
+    keys = ('{} energy contribution'.format(name),
+            '{} energy contribution units'.format(name))
+    return ('{} contrib'.format(name), _extract, keys)
 
 
 def _parse_hubbard_energy(line, lines):
@@ -433,47 +448,96 @@ def _parse_warning(line, lines):
     }
 
 
+_ionic_conv_keys = (
+    'ionic energy convergence threshold', 'forces convergence threshold',
+    'pressure convergence threshold', 'energy criteria', 'force criteria',
+    'cell criteria',
+)
+_kpoints_keys = (
+    'number of k-points', 'smearing type', 'smearing width',
+    'smearing width units', 'k-points coordinate system', 'list of k-points',
+    'list of k-point weights',
+)
+_forces_keys = (
+    'force units', 'forces', 'atomic forces',
+    'non-local contribution to forces', 'ionic contribution to forces',
+    'local contribution to forces', 'core corrections to forces',
+    'Hubbard contribution to forces', 'SCF correction term to forces',
+    'Atomic species index for forces', 'atomic species index for forces',
+    'total force', 'total SCF correction',
+)
+_atomic_positions_keys = (
+    'list of atomic species', 'list of atomic positions',
+    'atomic positions units',
+)
+
+# (trigger, extractor, keys the extractor can produce)
 base_rules = [
-    (lambda x: 'Program PWSCF' in x, _parse_header),
-    (lambda x: 'Reading input from' in x, _parse_input_filename),
-    (lambda x: 'PseudoPot. #' in x, _parse_pseudopotential),
-    (lambda x: 'bravais-lattice index' in x, _parse_bravais_lattice),
-    (lambda x: 'lattice parameter' in x, _parse_lattice_parameter),
-    (lambda x: 'crystal axes:' in x, _parse_cell_vectors),
-    (lambda x: 'CELL_PARAMETERS ' in x, _parse_cell_vectors),
-    (lambda x: 'unit-cell volume' in x, _parse_unit_cell_volume),
-    (lambda x: 'number of atoms/cell' in x, _parse_n_atoms_per_cell),
-    (lambda x: 'number of atomic types' in x, _parse_n_atom_types),
-    (lambda x: 'number of electrons' in x, _parse_n_electrons),
-    (lambda x: 'kinetic-energy cutoff' in x, _parse_kinetic_energy_cutoff),
-    (lambda x: 'charge density cutoff' in x, _parse_charge_density_cutoff),
-    (lambda x: 'mixing beta ' in x, _parse_mixing_beta),
-    (lambda x: 'convergence threshold ' in x, _parse_scf_conv_threshold),
-    (lambda x: 'convergence thresholds ' in x, _parse_ionic_conv_threshold),
-    (lambda x: 'criteria: energy ' in x, _parse_ionic_conv_threshold),
-    (lambda x: 'Exchange-correlation' in x, _parse_xc),
-    (lambda x: 'number of k points=' in x, _parse_kpoints_block),
-    (lambda x: 'Fermi energy is' in x, _parse_fermi_energy),
-    (lambda x: '!    total energy' in x, _parse_total_energy),
+    ('Program PWSCF', _parse_header,
+     ('version', 'start_date', 'start_time')),
+    ('Reading input from', _parse_input_filename, ('input file',)),
+    ('PseudoPot. #', _parse_pseudopotential, ('pseudopotential file',)),
+    ('bravais-lattice index', _parse_bravais_lattice,
+     ('bravais-lattice index',)),
+    ('lattice parameter', _parse_lattice_parameter,
+     ('lattice parameter', 'lattice parameter units')),
+    ('crystal axes:', _parse_cell_vectors,
+     ('cell vectors', 'cell vectors units')),
+    ('CELL_PARAMETERS ', _parse_cell_vectors,
+     ('cell vectors', 'cell vectors units')),
+    ('unit-cell volume', _parse_unit_cell_volume,
+     ('unit-cell volume', 'unit-cell volume units')),
+    ('number of atoms/cell', _parse_n_atoms_per_cell,
+     ('number of atoms/cell',)),
+    ('number of atomic types', _parse_n_atom_types,
+     ('number of atom types',)),
+    ('number of electrons', _parse_n_electrons, ('number of electrons',)),
+    ('kinetic-energy cutoff', _parse_kinetic_energy_cutoff,
+     ('kinetic-energy cutoff', 'kinetic-energy cutoff units')),
+    ('charge density cutoff', _parse_charge_density_cutoff,
+     ('charge density cutoff', 'charge density cutoff units')),
+    ('mixing beta ', _parse_mixing_beta, ('mixing beta',)),
+    ('convergence threshold ', _parse_scf_conv_threshold,
+     ('scf convergence threshold',)),
+    ('convergence thresholds ', _parse_ionic_conv_threshold,
+     _ionic_conv_keys),
+    ('criteria: energy ', _parse_ionic_conv_threshold, _ionic_conv_keys),
+    ('Exchange-correlation', _parse_xc, ('exchange-correlation',)),
+    ('number of k points=', _parse_kpoints_block, _kpoints_keys),
+    ('Fermi energy is', _parse_fermi_energy,
+     ('fermi energy', 'fermi energy units')),
+    ('!    total energy', _parse_total_energy,
+     ('total energy', 'total energy units')),
     _gen_energy_contrib('one-electron'),
     _gen_energy_contrib('hartree'),
     _gen_energy_contrib('xc'),
     _gen_energy_contrib('ewald'),
     _gen_energy_contrib('smearing'),
-    (lambda x: 'Hubbard energy' in x, _parse_hubbard_energy),
-    (lambda x: 'Forces acting on atoms' in x, _parse_forces),
-    (lambda x: 'total   stress' in x, _parse_stress_and_pressure),
-    (lambda x: 'Simplified LDA+U calculation' in x, _parse_ldau_parameters),
-    (lambda x: 'bfgs converged in' in x, _parse_n_bfgs_steps),
-    (lambda x: 'convergence has been ' in x, _parse_n_steps_for_sc),
-    (lambda x: 'PWSCF' and 'WALL' in x, _parse_total_cpu_time),
-    (lambda x: 'atom                  pos' in x, _parse_atomic_positions),
-    (lambda x: 'ATOMIC_POSITIONS' in x, _parse_atomic_positions),
-    (lambda x: 'Starting magnetic ' in x, _parse_starting_mag_structure),
-    (lambda x: 'total magnetization' in x, _parse_total_magnetization),
-    (lambda x: 'absolute magnetization' in x, _parse_absolute_magnetization),
-    (lambda x: 'Magnetic moment per site' in x, _parse_site_proj_quantities),
-    (lambda x: 'warning' in x.lower(), _parse_warning),
+    ('Hubbard energy', _parse_hubbard_energy,
+     ('Hubbard energy contribution', 'Hubbard energy contribution units')),
+    ('Forces acting on atoms', _parse_forces, _forces_keys),
+    ('total   stress', _parse_stress_and_pressure,
+     ('pressure', 'pressure units', 'stress', 'stress units')),
+    ('Simplified LDA+U calculation', _parse_ldau_parameters,
+     ('LDA+U l_max', 'LDA+U parameters')),
+    ('bfgs converged in', _parse_n_bfgs_steps,
+     ('scf cycle count', 'bfgs step count')),
+    ('convergence has been ', _parse_n_steps_for_sc,
+     ('number of electronic iterations for convergence',
+      'number of iterations for self-consistency')),
+    ('WALL', _parse_total_cpu_time, ('total CPU time',)),
+    ('atom                  pos', _parse_atomic_positions,
+     _atomic_positions_keys),
+    ('ATOMIC_POSITIONS', _parse_atomic_positions, _atomic_positions_keys),
+    ('Starting magnetic ', _parse_starting_mag_structure,
+     ('starting magnetic structure',)),
+    ('total magnetization', _parse_total_magnetization,
+     ('total magnetization', 'total magnetization units')),
+    ('absolute magnetization', _parse_absolute_magnetization,
+     ('absolute magnetization', 'absolute magnetization units')),
+    ('Magnetic moment per site', _parse_site_proj_quantities,
+     ('site-projected charges', 'site-projected magnetic moments')),
+    (re.compile('warning', re.IGNORECASE), _parse_warning, ('warning',)),
 ]
 
 
@@ -483,3 +547,51 @@ class PwscfStdOutputParser(BlockParser):
         BlockParser.__init__(self)
         for rule in rules:
             self.add_rule(rule)
+
+    def parse_trajectory(self, generator):
+        """Parse the lines of a PWscf output into arrays of its ionic steps (requires NumPy).
+
+        See :func:`dftparse.pwscf.stdout_arrays.assemble_trajectory` for the arrays returned.
+        """
+        from .stdout_arrays import assemble_trajectory, trajectory_rules
+        matches = self._sub_parser(trajectory_rules).parse(generator, sparse=True)
+        return assemble_trajectory(match.block for match in matches)
+
+    def parse_file_trajectory(self, path, encoding='utf-8'):
+        """Parse a PWscf output file into arrays of its ionic steps, as :meth:`parse_trajectory` would its lines"""
+        from .stdout_arrays import assemble_trajectory, trajectory_rules
+        matches = self._sub_parser(trajectory_rules).parse_file(path, sparse=True, encoding=encoding)
+        return assemble_trajectory(match.block for match in matches)
+
+    def parse_bands(self, generator):
+        """Parse the band energies listed in the lines of a PWscf output into arrays (requires NumPy).
+
+        See :func:`dftparse.pwscf.stdout_arrays.assemble_bands` for the arrays returned.
+        """
+        from .stdout_arrays import assemble_bands, band_rules
+        matches = self._sub_parser(band_rules).parse(generator, sparse=True)
+        return assemble_bands(match.block for match in matches)
+
+    def parse_file_bands(self, path, encoding='utf-8'):
+        """Parse the band energies listed in a PWscf output file, as :meth:`parse_bands` would its lines"""
+        from .stdout_arrays import assemble_bands, band_rules
+        matches = self._sub_parser(band_rules).parse_file(path, sparse=True, encoding=encoding)
+        return assemble_bands(match.block for match in matches)
+
+    def parse_scf_history(self, generator):
+        """Parse the convergence of every SCF iteration in the lines of a PWscf output (requires NumPy).
+
+        See :meth:`dftparse.pwscf.stdout_arrays.ScfHistory.cycles` for the arrays returned.
+        """
+        from .stdout_arrays import ScfHistory, scf_rules
+        history = ScfHistory()
+        history.extend(match.block for match in self._sub_parser(scf_rules).parse(generator, sparse=True))
+        return history.cycles()
+
+    def parse_file_scf_history(self, path, encoding='utf-8'):
+        """Parse the SCF convergence in a PWscf output file, as :meth:`parse_scf_history` would its lines"""
+        from .stdout_arrays import ScfHistory, scf_rules
+        history = ScfHistory()
+        matches = self._sub_parser(scf_rules).parse_file(path, sparse=True, encoding=encoding)
+        history.extend(match.block for match in matches)
+        return history.cycles()
@@ -1,7 +1,15 @@
+import asyncio
+import os
+import tempfile
 import unittest
 
 from dftparse.pwscf.stdout_parser import PwscfStdOutputParser
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class TestPwscfStdOutputParser(unittest.TestCase):
     """Unit tests for parsing the standard output from PWscf runs
@@ -245,6 +253,60 @@ class TestPwscfStdOutputParser(unittest.TestCase):
         self.assertEqual(results[0]['number of k-points'], 146)
         self.assertTrue('list of k-points' not in results[0])
 
+    @unittest.skipIf(np is None, "requires NumPy")
+    def test_parse_kpoints_block_arrays(self):
+        """Test parsing the k-points into arrays, with their crystal coordinates."""
+        from dftparse.pwscf.stdout_arrays import array_rules
+        lines = """
+            number of k points=     3  Marzari-Vanderbilt smearing, width (Ry)=  0.0100
+                           cart. coord. in units 2pi/alat
+            k(    1) = (   0.0000000   0.0000000   0.1534638), wk =   0.5000000
+            k(    2) = (  -0.1436461  -0.2488023   0.2557731), wk =   1.0000000
+            k(    3) = (   0.2872922   0.4976046  -0.0511547), wk =   0.5000000
+
+                           cryst. coord.
+            k(    1) = (   0.0000000   0.0000000   0.2500000), wk =   0.5000000
+            k(    2) = (   0.0000000  -0.2500000   0.2500000), wk =   1.0000000
+            k(    3) = (   0.5000000   0.2500000   0.0000000), wk =   0.5000000
+
+        """.split('\n')
+        arrays = [r for r in PwscfStdOutputParser(array_rules).parse(lines) if r][0]
+        lists = [r for r in self.parser.parse(lines) if r][0]
+        self.assertEqual(arrays['list of k-points'].shape, (3, 3))
+        np.testing.assert_array_equal(arrays['list of k-points'], lists['list of k-points'])
+        np.testing.assert_array_equal(arrays['list of k-point weights'], lists['list of k-point weights'])
+        np.testing.assert_array_equal(arrays['list of k-points in crystal coordinates'][1], [0, -0.25, 0.25])
+        self.assertEqual(arrays['smearing type'], 'Marzari-Vanderbilt')
+        self.assertEqual(arrays['k-points coordinate system'], 'cart. coord. in units 2pi/alat')
+
+        # blocks right after the listing are left to their rules, when parsing lines or a file
+        fermi = '            the Fermi energy is    13.1968 ev'
+        for following in ([fermi], ['', fermi]):
+            text = '\n'.join(lines[:6] + following) + '\n'
+            parsed = [r.block for r in PwscfStdOutputParser(array_rules).parse(text.splitlines(True), sparse=True)]
+            self.assertEqual(len(parsed[0]['list of k-points']), 3)
+            self.assertEqual(parsed[1]['fermi energy'], 13.1968)
+            with tempfile.NamedTemporaryFile('w', suffix='.out', delete=False) as f:
+                f.write(text)
+            try:
+                from_file = [r.block for r in PwscfStdOutputParser(array_rules).parse_file(f.name, sparse=True)]
+            finally:
+                os.remove(f.name)
+            self.assertEqual([sorted(block) for block in from_file], [sorted(block) for block in parsed])
+
+        # without the crystal coordinates, or the list, of low verbosity
+        arrays = [r for r in PwscfStdOutputParser(array_rules).parse(lines[:7]) if r][0]
+        self.assertNotIn('list of k-points in crystal coordinates', arrays)
+        self.assertEqual(len(arrays['list of k-points']), 3)
+        lines = """
+            number of k points=   146  Methfessel-Paxton smearing, width (Ry)=  0.0037
+
+            Number of k-points >= 100: set verbosity='high' to print them.
+        """.split('\n')
+        arrays = [r for r in PwscfStdOutputParser(array_rules).parse(lines) if r][0]
+        self.assertEqual(arrays['number of k-points'], 146)
+        self.assertNotIn('list of k-points', arrays)
+
     def test_parse_fermi_energy(self):
         """Test parsing the Fermi energy."""
         lines = ['    the Fermi energy is    13.1968 ev  ']
@@ -397,6 +459,261 @@ class TestPwscfStdOutputParser(unittest.TestCase):
         self.assertAlmostEqual(flattened['stress'][1][1], -81.34)
         self.assertEqual(flattened['stress units'], 'kbar')
 
+    @unittest.skipIf(np is None, "requires NumPy")
+    def test_parse_forces_and_stress_arrays(self):
+        """Test parsing forces and stress into arrays, agreeing with the lists."""
+        from dftparse.pwscf.stdout_arrays import array_rules
+        lines = """
+            Forces acting on atoms (cartesian axes, Ry/au):
+
+            atom    1 type  1   force =   0.00000000  0.00000000   0.00000012
+            atom    2 type  2   force =   0.00000000  0.00000000   0.00000054
+            atom    3 type  2   force =   0.00000031  0.00000000  -0.00000066
+            The non-local contrib.  to forces
+            atom    1 type  1   force =   0.00000000  0.00000000   0.00000000
+            atom    2 type  2   force =   0.00000000  0.00000000  -0.00000016
+            atom    3 type  2   force =   0.00000000  0.00000000   0.00000016
+            The SCF correction term to forces
+            atom    1 type  1   force =   0.00000000  0.00000000   0.00000000
+            atom    2 type  2   force =   0.00000000  0.00000000  -0.00000117
+            atom    3 type  2   force =   0.00000000  0.00000000   0.00000117
+
+            Total force =     0.011752   Total SCF correction =     0.000072
+               total   stress  (Ry/bohr**3)             (kbar)     P=  -77.72
+            -0.00055293   0.00000000   0.00000000  -81.34      0.00      0.00
+             0.00000000  -0.00055293   0.00000000    0.00    -81.34      0.00
+             0.00000000   0.00000000  -0.00047917    0.00      0.00    -70.49
+        """.split("\n")
+        forces, stress = [r.block for r in PwscfStdOutputParser(array_rules).parse(lines, sparse=True)]
+        self.assertEqual(forces['atomic forces'].shape, (3, 3))
+        np.testing.assert_array_equal(forces['atomic forces'][:, 2], [0.00000012, 0.00000054, -0.00000066])
+        np.testing.assert_array_equal(forces['non-local contribution to forces'][1], [0, 0, -0.00000016])
+        np.testing.assert_array_equal(forces['SCF correction term to forces'][2], [0, 0, 0.00000117])
+        np.testing.assert_array_equal(forces['atomic species index for forces'], [1, 2, 2])
+        self.assertEqual(forces['ionic contribution to forces'].shape, (0, 3))
+        self.assertEqual(forces['force units'], 'Ry/au')
+        self.assertAlmostEqual(forces['total SCF correction'], 0.000072)
+        # the same keys as the list rule, which only parses tables of the total forces or of all contributions
+        total_only = lines[:6] + lines[14:16]
+        arrays = [r.block for r in PwscfStdOutputParser(array_rules).parse(total_only, sparse=True)][0]
+        lists = [r.block for r in self.parser.parse(total_only, sparse=True)][0]
+        self.assertEqual(set(arrays), set(lists))
+        np.testing.assert_array_equal(arrays['forces'], lists['forces'])
+        np.testing.assert_array_equal(arrays['Atomic species index for forces'],
+                                      lists['Atomic species index for forces'])
+        self.assertEqual(stress['stress'].shape, (3, 3))
+        lists = [r.block for r in self.parser.parse(lines[-5:], sparse=True)][0]
+        np.testing.assert_array_equal(stress['stress'], lists['stress'])
+        self.assertAlmostEqual(stress['pressure'], -77.72)
+
+    @unittest.skipIf(np is None, "requires NumPy")
+    def test_parse_band_energies_not_numbers(self):
+        """Test that a band listing with a token that is not a number fails rather than coming back short."""
+        lines = """
+                      k = 0.0000 0.0000 0.0000 (  1139 PWs)   bands (ev):
+
+                -5.8184   6.1935   ******   6.1935   8.7656
+
+        """.split('\n')
+        with self.assertRaises(ValueError):
+            self.parser.parse_bands(lines)
+
+    @unittest.skipIf(np is None, "requires NumPy")
+    def test_parse_trajectory(self):
+        """Test grouping the blocks of a vc-relax run into arrays of its ionic steps."""
+        step = """
+            !    total energy              =     {energy} Ry
+                 Forces acting on atoms (cartesian axes, Ry/au):
+
+                 atom    1 type  1   force =   0.00000000  0.00000000   {force}
+                 atom    2 type  1   force =   0.00000000  0.00000000  -{force}
+
+                 Total force =     0.011752   Total SCF correction =     0.000072
+            {stress}
+            CELL_PARAMETERS (alat= 10.00000000)
+               1.000000000   0.000000000   0.000000000
+               0.000000000   1.000000000   0.000000000
+               0.000000000   0.000000000   {c}
+
+            ATOMIC_POSITIONS (crystal)
+            Si       0.000000000   0.000000000   0.000000000
+            Si       0.250000000   0.250000000   0.250000000   0   0   1
+
+        """
+        stress = """
+                   total   stress  (Ry/bohr**3)             (kbar)     P=  -77.72
+                -0.00055293   0.00000000   0.00000000  -81.34      0.00      0.00
+                 0.00000000  -0.00055293   0.00000000    0.00    -81.34      0.00
+                 0.00000000   0.00000000  -0.00047917    0.00      0.00    -70.49
+        """
+        header = """
+            lattice parameter (alat)  =      10.0000  a.u.
+            crystal axes: (cart. coord. in units of alat)
+                      a(1) = (   1.000000   0.000000   0.000000 )
+                      a(2) = (   0.000000   1.000000   0.000000 )
+                      a(3) = (   0.000000   0.000000   1.000000 )
+
+                 site n.     atom                  positions (alat units)
+                     1           Si  tau(   1) = (   0.0000000   0.0000000   0.0000000  )
+                     2           Si  tau(   2) = (   0.2000000   0.2000000   0.2000000  )
+
+        """
+        lines = (header + step.format(energy=-15.5, force='0.01', stress=stress, c='1.1')
+                 + step.format(energy=-15.7, force='0.001', stress='', c='1.2')).split('\n')
+        trajectory = self.parser.parse_trajectory(lines)
+
+        alat = 10.0 * 0.52917721067
+        np.testing.assert_allclose(trajectory['total energy'], [-15.5, -15.7])
+        self.assertEqual(trajectory['positions'].shape, (2, 2, 3))
+        np.testing.assert_allclose(trajectory['positions'][0, 1], [0.2 * alat] * 3)
+        np.testing.assert_allclose(trajectory['positions'][1, 1], [0.25 * alat, 0.25 * alat, 0.25 * 1.1 * alat])
+        np.testing.assert_allclose(trajectory['cell vectors'][:, 2, 2], [alat, 1.1 * alat])
+        np.testing.assert_allclose(trajectory['forces'][:, 1, 2], [-0.01, -0.001])
+        np.testing.assert_allclose(trajectory['stress'][0].diagonal(), [-81.34, -81.34, -70.49])
+        self.assertTrue(np.isnan(trajectory['stress'][1]).all())
+
+    @unittest.skipIf(np is None, "requires NumPy")
+    def test_parse_trajectory_crystal_positions(self):
+        """Test that the header positions PWscf lists in crystal coordinates with high verbosity are converted."""
+        lines = """
+            lattice parameter (alat)  =      10.0000  a.u.
+            crystal axes: (cart. coord. in units of alat)
+                      a(1) = (   1.000000   0.000000   0.000000 )
+                      a(2) = (   0.000000   1.000000   0.000000 )
+                      a(3) = (   0.000000   0.000000   2.000000 )
+
+               Cartesian axes
+
+                 site n.     atom                  positions (alat units)
+                     1           Si  tau(   1) = (   0.0000000   0.0000000   0.0000000  )
+                     2           Si  tau(   2) = (   0.2000000   0.2000000   0.4000000  )
+
+               Crystallographic axes
+
+                 site n.     atom                  positions (cryst. coord.)
+                     1           Si  tau(   1) = (  0.0000000  0.0000000  0.0000000  )
+                     2           Si  tau(   2) = (  0.2000000  0.2000000  0.2000000  )
+
+            !    total energy              =     -15.5 Ry
+        """.split('\n')
+        trajectory = self.parser.parse_trajectory(lines)
+
+        alat = 10.0 * 0.52917721067
+        np.testing.assert_allclose(trajectory['positions'][0, 1], [0.2 * alat, 0.2 * alat, 0.4 * alat])
+
+    @unittest.skipIf(np is None, "requires NumPy")
+    def test_parse_bands(self):
+        """Test parsing the band energies and occupations of each spin into arrays."""
+        lines = """
+            End of self-consistent calculation
+
+            ------ SPIN UP ------------
+
+
+                      k = 0.0000 0.0000 0.0000 (  1139 PWs)   bands (ev):
+
+                -5.8184   6.1935   6.1935   6.1935   8.7656   8.7656   8.7656   9.4790
+                 9.9000
+
+                 occupation numbers
+                 1.0000   1.0000   1.0000   1.0000   0.0000   0.0000   0.0000   0.0000
+                 0.0000
+
+                      k =-0.1250 0.1250-0.1250 (  1142 PWs)   bands (ev):
+
+              -100.1234-100.0000   5.9000   6.0000   8.0000   8.5000   8.6000   9.0000
+                 9.5000
+
+                 occupation numbers
+                 1.0000   1.0000   1.0000   0.5000   0.0000   0.0000   0.0000   0.0000
+                 0.0000
+
+            ------ SPIN DOWN ----------
+
+
+                      k = 0.0000 0.0000 0.0000 (  1139 PWs)   bands (ev):
+
+                -5.7000   6.2000   6.2000   6.2000   8.8000   8.8000   8.8000   9.5000
+                 9.9500
+
+                      k =-0.1250 0.1250-0.1250 (  1142 PWs)   bands (ev):
+
+                -5.6000   6.0000   6.1000   6.2000   8.1000   8.6000   8.7000   9.1000
+                 9.6000
+
+                 the Fermi energy is     6.1000 ev
+        """.split('\n')
+        listings = self.parser.parse_bands(lines)
+        self.assertEqual(len(listings), 1)
+        bands = listings[0]
+        self.assertEqual(bands['energies'].shape, (2, 9, 2))
+        np.testing.assert_array_equal(bands['kpoints'][1], [-0.125, 0.125, -0.125])
+        np.testing.assert_array_equal(bands['energies'][1, :2, 0], [-100.1234, -100.0])
+        np.testing.assert_array_equal(bands['energies'][:, 8, 1], [9.95, 9.6])
+        # occupations are only listed for spin up
+        self.assertNotIn('occupancies', bands)
+
+        listings = self.parser.parse_bands(lines[:24] * 2)
+        self.assertEqual(len(listings), 2)
+        self.assertEqual(listings[1]['occupancies'].shape, (2, 9, 1))
+        self.assertEqual(listings[1]['occupancies'][1, 3, 0], 0.5)
+
+        # a running calculation cut off after the first k-point of spin down
+        bands, = self.parser.parse_bands(lines[:31])
+        self.assertEqual(bands['energies'].shape, (2, 9, 2))
+        self.assertEqual(bands['energies'][0, 8, 1], 9.95)
+        self.assertTrue(np.isnan(bands['energies'][1, :, 1]).all())
+
+    @unittest.skipIf(np is None, "requires NumPy")
+    def test_parse_scf_history(self):
+        """Test parsing the convergence of every SCF iteration, one set of arrays per cycle."""
+        cycle = """
+                 total cpu time spent up to now is        0.2 secs
+
+                 Self-consistent Calculation
+
+                 iteration #  1     ecut=    30.00 Ry     beta= 0.70
+                 Davidson diagonalization with overlap
+                 ethr =  1.00E-02,  avg # of iterations =  2.0
+
+                 total cpu time spent up to now is        0.5 secs
+
+                 total energy              =     -15.79103983 Ry
+                 estimated scf accuracy    <       0.06376159 Ry
+
+                 iteration #  2     ecut=    30.00 Ry     beta= 0.70
+                 Davidson diagonalization with overlap
+                 ethr =  7.97E-04,  avg # of iterations =  1.0
+
+                 total cpu time spent up to now is        0.7 secs
+
+                 End of self-consistent calculation
+
+            !    total energy              =     {energy} Ry
+                 estimated scf accuracy    <          4.4E-09 Ry
+
+                 The total energy is the sum of the following terms:
+                 convergence has been achieved in   2 iterations
+        """
+        lines = (cycle.format(energy=-15.81) + cycle.format(energy=-15.82)).split('\n')
+        cycles = self.parser.parse_scf_history(lines)
+        self.assertEqual(len(cycles), 2)
+        np.testing.assert_array_equal(cycles[0]['scf iteration'], [1, 2])
+        np.testing.assert_array_equal(cycles[0]['scf iteration total energy'], [-15.79103983, -15.81])
+        np.testing.assert_array_equal(cycles[0]['estimated scf accuracy'], [0.06376159, 4.4e-9])
+        np.testing.assert_array_equal(cycles[1]['total cpu time spent'], [0.5, 0.7])
+        np.testing.assert_array_equal(cycles[1]['scf iteration total energy'], [-15.79103983, -15.82])
+
+        # the history of a running cycle
+        from dftparse.core import BlockParser
+        from dftparse.pwscf.stdout_arrays import ScfHistory, scf_rules
+        history = ScfHistory()
+        history.extend(m.block for m in BlockParser(scf_rules).parse(lines[:12], sparse=True))
+        running = history.cycles()
+        self.assertEqual(len(running), 1)
+        np.testing.assert_array_equal(running[0]['scf iteration total energy'], [-15.79103983])
+        self.assertTrue(np.isnan(running[0]['estimated scf accuracy'][0]))
+
     def test_parse_ldau_parameters(self):
         """Test parsing simplified LDA+parameters used."""
         lines = """
@@ -415,6 +732,78 @@ class TestPwscfStdOutputParser(unittest.TestCase):
         self.assertEqual(flattened['LDA+U parameters']['Fe2']['L'], 2)
         self.assertEqual(flattened['LDA+U parameters']['Fe2']['U'], 4.3)
 
+    def test_parse_async(self):
+        """Test parsing multi-line blocks from an async source."""
+        lines = """
+            Simplified LDA+U calculation (l_max = 2) with parameters (eV):
+            atomic species    L          U    alpha       J0     beta
+               Fe1            2     4.3000   0.0000   0.0000   0.0000
+
+            Forces acting on atoms (Ry/au):
+
+            atom    1 type  1   force =   0.00000000  0.00000000   0.00000000
+            atom    2 type  2   force =   0.00000000  0.00000000   0.00000054
+
+            Total force =     0.011752   Total SCF correction =     0.000072
+        """.split("\n")
+
+        async def _source():
+            for line in lines:
+                await asyncio.sleep(0)
+                yield line
+
+        async def _parse():
+            return [r async for r in self.parser.parse_async(_source(), sparse=True)]
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(_parse())
+        finally:
+            loop.close()
+        self.assertEqual([r.rule for r in results],
+                         ['_parse_ldau_parameters', '_parse_forces'])
+        self.assertEqual(results[0].block['LDA+U parameters']['Fe1']['U'], 4.3)
+        self.assertAlmostEqual(results[1].block['atomic forces'][1][2], 0.00000054)
+        self.assertEqual(results, list(self.parser.parse(lines, sparse=True)))
+
+    def test_parse_keys_first(self):
+        """Test parsing only the first occurrence of selected quantities."""
+        lines = """
+            lattice parameter (alat)  =      10.2000  a.u.
+            kinetic-energy cutoff     =      30.0000  Ry
+            !    total energy              =     -15.79441848 Ry
+            !    total energy              =     -15.79441999 Ry
+        """.split("\n")
+        results = list(self.parser.parse(
+            lines, sparse=True, keys=['lattice parameter', 'total energy'],
+            first=True))
+        self.assertEqual([r.rule for r in results],
+                         ['_parse_lattice_parameter', '_parse_total_energy'])
+        self.assertAlmostEqual(results[1].block['total energy'], -15.79441848)
+
+    def test_parse_last(self):
+        """Test parsing the final energy and stress of a run from the end of its output."""
+        step = """
+            !    total energy              =     {:.8f} Ry
+                 total   stress  (Ry/bohr**3)             (kbar)     P=  {:.2f}
+            -0.00055293   0.00000000   0.00000000  -81.34      0.00      0.00
+             0.00000000  -0.00055293   0.00000000    0.00    -81.34      0.00
+             0.00000000   0.00000000  -0.00047917    0.00      0.00    -70.49
+        """
+        text = "".join(step.format(-15.79 - i, -77.72 + i) for i in range(50))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'pw.out')
+            with open(path, 'w') as f:
+                f.write(text)
+            last = self.parser.parse_last(path, keys=['total energy', 'pressure', 'stress'])
+            forward = {}
+            for r in self.parser.parse(text.split('\n')):
+                forward.update(r)
+        self.assertAlmostEqual(last['total energy'], -64.79)
+        self.assertAlmostEqual(last['pressure'], -28.72)
+        self.assertEqual(last, {key: forward[key] for key in last})
+        self.assertNotIn('total energy units', last)
+
     def test_parse_n_bfgs_steps(self):
         """Test parsing the # BFGS steps required for convergence."""
         lines = ['   bfgs converged in  11 scf cycles and  10 bfgs steps  ']
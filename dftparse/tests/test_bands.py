@@ -0,0 +1,99 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dftparse.bands import band_edges, fermi_level, kpoint_arrays, occupied_states  # noqa: E402
+
+
+def _insulator():
+    """Two k-points, three bands, two spins: direct gap in spin up, indirect gap in spin down"""
+    energies = np.array([
+        [[-5.0, -5.1], [1.0, 0.8], [3.0, 2.0]],
+        [[-4.0, -4.1], [1.2, 0.9], [2.5, 2.5]],
+    ])
+    occupancies = np.array([
+        [[1.0, 1.0], [1.0, 1.0], [0.0, 0.0]],
+        [[1.0, 1.0], [1.0, 1.0], [0.0, 0.0]],
+    ])
+    return energies, occupancies
+
+
+def test_band_edges_insulator():
+    """Test that edges, gaps and their k-points are found per spin channel"""
+    energies, occupancies = _insulator()
+    edges = band_edges(energies, occupancies)
+    np.testing.assert_allclose(edges["vbm"], [1.2, 0.9])
+    np.testing.assert_allclose(edges["cbm"], [2.5, 2.0])
+    np.testing.assert_allclose(edges["band gap"], [1.3, 1.1])
+    np.testing.assert_allclose(edges["direct gap"], [1.3, 1.2])
+    assert list(edges["vbm k-point index"]) == [1, 1]
+    assert list(edges["cbm k-point index"]) == [1, 0]
+    assert list(edges["direct gap k-point index"]) == [1, 0]
+    assert not edges["is metal"].any()
+    assert list(edges["is direct"]) == [True, False]
+    assert edges["band gap (all spins)"] == pytest.approx(0.8)
+
+
+def test_band_edges_metal():
+    """Test that crossing bands and partial occupancies make a channel metallic"""
+    energies, occupancies = _insulator()
+    occupancies[1, 1, 0] = 0.0
+    occupancies[1, 2, 0] = 1.0
+    occupancies[0, 1, 1] = 0.4
+    edges = band_edges(energies, occupancies)
+    assert list(edges["is metal"]) == [True, True]
+    assert list(edges["band gap"]) == [0.0, 0.0]
+    assert edges["band gap (all spins)"] == 0.0
+
+    # partial occupancies of k-points of zero weight do not count
+    edges = band_edges(energies, _insulator()[1] + [[[0, 0]] * 3, [[0, 0], [0, -0.4], [0, 0]]],
+                       weights=[1.0, 0.0])
+    assert not edges["is metal"].any()
+
+
+def test_band_edges_fermi_level():
+    """Test that a Fermi level tells occupied states when there are no occupancies"""
+    energies, occupancies = _insulator()
+    assert (occupied_states(energies, fermi_level=[1.5, 1.5]) == (occupancies > 0.5)).all()
+    edges = band_edges(energies, fermi_level=1.5)
+    np.testing.assert_allclose(edges["band gap"], [1.3, 1.1])
+
+
+def test_band_edges_band_crossing_fermi_level():
+    """Test that a band below the Fermi level at one k-point and above it at another makes a channel metallic"""
+    energies = np.array([[[-2.0], [-0.5], [2.0]], [[-2.0], [0.7], [2.0]]])
+    edges = band_edges(energies, fermi_level=0.0)
+    assert list(edges["is metal"]) == [True]
+    assert list(edges["band gap"]) == [0.0]
+
+    # likewise with integer occupancies, unless the k-point is not counted
+    occupancies = np.array([[[1.0], [1.0], [0.0]], [[1.0], [0.0], [0.0]]])
+    assert list(band_edges(energies, occupancies)["is metal"]) == [True]
+    assert list(band_edges(energies, occupancies, weights=[1.0, 0.0])["is metal"]) == [False]
+
+    # an occupied state of a zero-weight k-point above the conduction band minimum
+    energies = np.array([[[-1.0], [1.0]], [[1.5], [3.0]]])
+    occupancies = np.array([[[1.0], [0.0]], [[1.0], [0.0]]])
+    assert list(band_edges(energies, occupancies)["is metal"]) == [True]
+    assert list(band_edges(energies, occupancies, weights=[1.0, 0.0])["is metal"]) == [False]
+
+
+def test_fermi_level():
+    """Test that the Fermi level is midgap for insulators and at the last filled state otherwise"""
+    energies, occupancies = _insulator()
+    np.testing.assert_allclose(fermi_level(energies, occupancies), [1.85, 1.45])
+
+    # half of the third band of the first k-point, of weight 3/4
+    occupancies[0, 2, 0] = 0.5
+    np.testing.assert_allclose(fermi_level(energies, occupancies, weights=[3, 1])[0], 3.0)
+
+
+def test_kpoint_arrays():
+    """Test that the dicts of EigenvalParser.parse stack into arrays"""
+    kpoints = [{}, {"kpoint": [0.0, 0.0, 0.0], "weight": 0.5, "energies": [(-1.0,), (2.0,)],
+                    "occupancies": [(1.0,), (0.0,)]},
+               {"kpoint": [0.5, 0.0, 0.0], "weight": 0.5, "energies": [(-0.5,), (2.5,)],
+                "occupancies": [(1.0,), (0.0,)]}]
+    arrays = kpoint_arrays(kpoints)
+    assert arrays["energies"].shape == (2, 2, 1)
+    assert band_edges(arrays["energies"], arrays["occupancies"])["band gap"][0] == 2.5
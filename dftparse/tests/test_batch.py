@@ -0,0 +1,32 @@
+from dftparse.batch import parse_many
+from dftparse.vasp.outcar_parser import OutcarParser
+from dftparse.wien2k.epsilon_parser import EpsilonParser
+
+
+def test_parse_many(tmp_path):
+    """Test that a batch parses every file, in order, and isolates failures"""
+    paths = []
+    for i in range(5):
+        path = tmp_path / "OUTCAR{}".format(i)
+        path.write_text("  volume of cell :       {}.00\n".format(20 + i))
+        paths.append(str(path))
+    paths.insert(2, str(tmp_path / "missing"))
+
+    results = list(parse_many(paths, OutcarParser, processes=2, sparse=True))
+    assert [r.path for r in results] == paths
+    assert results[2].blocks is None
+    assert "FileNotFoundError" in results[2].error
+    volumes = [r.blocks[0].block["volume of cell"] for r in results if r.error is None]
+    assert volumes == [20.0, 21.0, 22.0, 23.0, 24.0]
+
+    unordered = list(parse_many(paths, OutcarParser, processes=2, chunksize=2, ordered=False))
+    assert sorted(r.path for r in unordered) == sorted(paths)
+
+
+def test_parse_many_optics(tmp_path):
+    """Test that parsers with predicate rules work in a batch"""
+    path = tmp_path / "case.epsilon"
+    path.write_text("# Energy [eV] Re_eps_xx Im_eps_xx Re_eps_zz Im_eps_zz\n"
+                    "   0.312930  0.947976E+01  0.126675E+00  0.793167E+01  0.955959E-01\n")
+    result, = parse_many([str(path)], EpsilonParser, processes=1, sparse=True)
+    assert result.blocks[0].block["re_eps_xx"] == 9.47976
@@ -1,4 +1,11 @@
-from dftparse.core import BlockParser
+import asyncio
+import gzip
+import json
+import re
+
+import pytest
+
+from dftparse.core import BlockParser, peek
 
 
 def test_multiple_parsers():
@@ -12,3 +19,311 @@ def test_multiple_parsers():
     assert len(second_parser.rules) == 1
 
     assert len(first_parser.rules) == 0, "Non-local mutation of a parser's rules"
+
+
+def test_trigger_kinds():
+    """Test that literal, any-of, regex and predicate triggers all fire"""
+    parser = BlockParser([
+        ("energy", lambda line, lines: {"energy": True}),
+        (("force", "stress"), lambda line, lines: {"mechanics": True}),
+        (re.compile("warning", re.IGNORECASE), lambda line, lines: {"warning": True}),
+        (lambda x: x.startswith("#"), lambda line, lines: {"comment": True}),
+    ])
+    lines = ["total energy", "stress tensor", "WARNING!", "# header", "nothing", "forces"]
+    results = list(parser.parse(lines))
+    assert results == [
+        {"energy": True}, {"mechanics": True}, {"warning": True}, {"comment": True}, {}, {"mechanics": True}
+    ]
+
+
+def _parse_line(line, lines):
+    return {"line": line.strip()}
+
+
+def test_regex_triggers_with_groups_and_flags(tmp_path):
+    """Test that regex triggers with inline flags, verbose syntax, groups or backreferences fire as alone"""
+    parser = BlockParser([
+        (re.compile(r"(?i)warning"), _parse_line),
+        (re.compile(r"total \s+ energy  # the converged energy", re.VERBOSE), _parse_line),
+        (re.compile(r"(?P<key>force)s?:"), _parse_line),
+        (re.compile(r"(?P<key>stress):"), _parse_line),
+        (re.compile(r"(a)\1"), _parse_line),
+        (re.compile(r"(c)\1"), _parse_line),
+        (re.compile(r"^end"), _parse_line),
+    ])
+    lines = ["WARNING!", "total energy", "forces:", "stress:", "aa", "cc", "ac", "end"]
+    results = list(parser.parse(lines))
+    assert results == [{"line": line} for line in lines[:6]] + [{}, {"line": "end"}]
+
+    path = tmp_path / "output.txt"
+    path.write_text("\n".join(lines) + "\n")
+    assert list(parser.parse_file(str(path))) == results
+    assert list(parser.parse_file(str(path), sparse=True)) == list(parser.parse(lines, sparse=True))
+
+
+def _parse_with_note(line, lines):
+    """A block with an optional "note" line after it"""
+    block = {"value": int(line.split()[-1])}
+    following = peek(lines)
+    if following and following[0].startswith("note"):
+        block["note"] = next(lines).split()[-1]
+    return block
+
+
+def test_peek(tmp_path):
+    """Test that lines an extractor peeks at but does not read are left to the rules, whatever the source"""
+    parser = BlockParser([("value", _parse_with_note), ("total", _parse_total)])
+    lines = ["value 1", "note a", "value 2", "total 3", "value 4"]
+    expected = [{"value": 1, "note": "a"}, {"value": 2}, {"total": 3}, {"value": 4}]
+    dense = list(parser.parse(lines))
+    assert dense == expected
+    sparse = list(parser.parse(lines, sparse=True))
+    assert [match.block for match in sparse] == expected
+    assert [match.line_number for match in sparse] == [1, 3, 4, 5]
+    assert [match.line_number for match in parser.parse(lines, sparse=True, keys=["total"], first=True)] == [1, 3, 4]
+    assert _run(_collect(parser.parse_async(_trickle(lines), sparse=True))) == sparse
+
+    path = tmp_path / "output.txt"
+    path.write_text("\n".join(lines) + "\n")
+    assert list(parser.parse_file(str(path), sparse=True)) == sparse
+    assert list(parser.parse_file(str(path))) == dense
+    # following a file, the last block waits for the line after it
+    matches, checkpoint = parser.follow(str(path))
+    assert matches == sparse[:-1]
+    with open(str(path), "a") as f:
+        f.write("note b\n")
+    assert [match.block for match in parser.follow(str(path), checkpoint)[0]] == [{"value": 4, "note": "b"}]
+
+    assert peek(iter(["a", "b", "c"]), 2) == ["a", "b"]
+    assert peek(iter(["a"]), 2) == ["a"]
+
+
+def test_first_match_order():
+    """Test that the first matching rule wins, regardless of trigger kind or position in the line"""
+    parser = BlockParser([
+        (lambda x: x.endswith("!"), lambda line, lines: {"rule": 0}),
+        ("total energy", lambda line, lines: {"rule": 1}),
+        ("energy", lambda line, lines: {"rule": 2}),
+        ("total", lambda line, lines: {"rule": 3}),
+    ])
+    results = list(parser.parse(["total energy!", "energy total", "total", "the total energy"]))
+    assert [r["rule"] for r in results] == [0, 2, 3, 1]
+
+
+def test_multiline_extract():
+    """Test that an extractor can pull the lines following its trigger"""
+    def _extract(line, lines):
+        return {"values": [int(next(lines)) for _ in range(2)]}
+
+    results = list(BlockParser([("values:", _extract)]).parse(["values:", "1", "2", "3"]))
+    assert results == [{"values": [1, 2]}, {}]
+
+
+def test_sparse_parse():
+    """Test that sparse parsing yields only matches, tagged with line numbers and rule names"""
+    def _parse_values(line, lines):
+        return {"values": [int(next(lines)) for _ in range(2)]}
+
+    def _parse_total(line, lines):
+        return {"total": int(line.split()[-1])}
+
+    parser = BlockParser([("values:", _parse_values), ("total", _parse_total)])
+    lines = ["header", "values:", "1", "2", "", "total 3", "values:", "4", "5"]
+    results = list(parser.parse(lines, sparse=True))
+    assert [r.line_number for r in results] == [2, 6, 7]
+    assert [r.rule for r in results] == ["_parse_values", "_parse_total", "_parse_values"]
+    assert results[1].block == {"total": 3}
+
+    dense = [block for block in parser.parse(lines) if block]
+    assert dense == [r.block for r in results]
+
+
+def _values_parser():
+    def _parse_values(line, lines):
+        return {"values": [int(next(lines)) for _ in range(2)]}
+
+    def _parse_total(line, lines):
+        return {"total": int(line.split()[-1])}
+
+    return BlockParser([("values:", _parse_values), (re.compile(r"^total \d"), _parse_total)])
+
+
+def test_parse_file(tmp_path):
+    """Test that parsing a file directly agrees with parsing its lines"""
+    text = "header\nvalues:\n1\n2\n\ntotal 3\nnot a total 3\nvalues:\n4\n5\ntrailer"
+    path = tmp_path / "output.txt"
+    path.write_bytes(text.encode())
+    parser = _values_parser()
+    lines = text.splitlines(True)
+
+    assert list(parser.parse_file(str(path))) == list(parser.parse(lines))
+    assert list(parser.parse_file(str(path), sparse=True)) == list(parser.parse(lines, sparse=True))
+
+    # opaque predicates force a line-by-line scan, with the same results
+    parser.add_rule((lambda x: x.startswith("trailer"), lambda line, lines: {"trailer": True}))
+    assert list(parser.parse_file(str(path))) == list(parser.parse(lines))
+    assert list(parser.parse_file(str(path), sparse=True))[-1].line_number == 11
+
+
+def test_parse_empty_file(tmp_path):
+    """Test that an empty file parses to nothing"""
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert list(_values_parser().parse_file(str(path))) == []
+
+
+def _parse_section(line, lines):
+    """Collect the lines of a section, up to its 'end' line"""
+    body = []
+    newline = next(lines)
+    while newline.strip() != "end":
+        body.append(newline.strip())
+        newline = next(lines)
+    return {"section": body}
+
+
+def _parse_total(line, lines):
+    return {"total": int(line.split()[-1])}
+
+
+def test_parse_file_parallel(tmp_path):
+    """Test that blocks straddling chunk boundaries parse as they would sequentially
+
+    Sections hold lines that look like triggers but would fail to parse if a chunk
+    started inside them.
+    """
+    text = "".join(
+        "section\ntotal x{0}\nline {0}\nend\ntotal {0}\n\n".format(i) for i in range(20)
+    )
+    path = tmp_path / "output.txt"
+    path.write_bytes(text.encode())
+    parser = BlockParser([("section", _parse_section), ("total", _parse_total)])
+
+    expected = list(parser.parse(text.splitlines(True), sparse=True))
+    assert len(expected) == 40
+    for chunk_size in (1, 7, 16, 23, 50, 200):
+        assert list(parser.parse_file(str(path), sparse=True, processes=2, chunk_size=chunk_size)) == expected
+    assert list(parser.parse_file(str(path), processes=2, chunk_size=30)) == list(parser.parse(text.splitlines(True)))
+
+
+async def _trickle(lines):
+    """Async source handing lines over one at a time"""
+    for line in lines:
+        await asyncio.sleep(0)
+        yield line
+
+
+async def _collect(agen):
+    return [item async for item in agen]
+
+
+def _run(coroutine):
+    """Run a coroutine in a new event loop, as asyncio.run does from Python 3.7"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_parse_async():
+    """Test that parsing an async source agrees with parsing it synchronously"""
+    parser = BlockParser([("section", _parse_section), ("total", _parse_total)])
+    lines = ["section", "a", "b", "c", "d", "e", "end", "total 3", "", "section", "f", "end"]
+
+    results = _run(_collect(parser.parse_async(_trickle(lines))))
+    assert results == list(parser.parse(lines))
+    results = _run(_collect(parser.parse_async(_trickle(lines), sparse=True)))
+    assert results == list(parser.parse(lines, sparse=True))
+
+
+def test_follow(tmp_path):
+    """Test that following a growing file parses each block once, resuming from checkpoints"""
+    parser = BlockParser([("section", _parse_section), ("total", _parse_total)])
+    path = tmp_path / "output.txt"
+    pieces = ["total 1\nsection\na\n", "b\nend\ntot", "al 2\n", "\nsection\nend\n"]
+
+    path.write_text(pieces[0])
+    matches, checkpoint = parser.follow(str(path))
+    assert [m.block for m in matches] == [{"total": 1}]
+    # the section is incomplete, so it is parsed from its trigger line next time
+    assert checkpoint["offset"] == len("total 1\n")
+
+    results = list(matches)
+    for piece in pieces[1:]:
+        with open(str(path), "a") as f:
+            f.write(piece)
+        matches, checkpoint = parser.follow(str(path), json.loads(json.dumps(checkpoint)))
+        results.extend(matches)
+    text = "".join(pieces)
+    assert results == list(parser.parse(text.splitlines(True), sparse=True))
+    assert checkpoint["line_number"] == text.count("\n")
+
+    # a truncated file is parsed from the top again
+    path.write_text("total 3\n")
+    matches, checkpoint = parser.follow(str(path), checkpoint)
+    assert [m.block for m in matches] == [{"total": 3}]
+
+
+def _parse_energy(line, lines):
+    return {"energy": float(line.split()[-1]), "energy units": "eV"}
+
+
+def _parse_volume(line, lines):
+    return {"volume": float(line.split()[-1])}
+
+
+def test_parse_keys(tmp_path):
+    """Test that rules are pruned by key, and that parsing for first occurrences stops early"""
+    parser = BlockParser([
+        ("energy", _parse_energy, ("energy", "energy units")),
+        ("volume", _parse_volume, ("volume",)),
+        ("total", _parse_total),
+    ])
+    lines = ["volume 1", "energy 2", "total 3", "volume 4", "energy 5", "filler", "filler"]
+
+    results = [m.block for m in parser.parse(lines, sparse=True, keys=["energy"])]
+    assert results == [{"energy": 2.0, "energy units": "eV"}, {"total": 3}, {"energy": 5.0, "energy units": "eV"}]
+
+    consumed = []
+
+    def _source():
+        for line in lines:
+            consumed.append(line)
+            yield line
+    results = [m.block for m in parser.parse(_source(), sparse=True, keys=["energy", "volume"], first=True)]
+    assert results == [{"volume": 1.0}, {"energy": 2.0, "energy units": "eV"}]
+    assert len(consumed) == 2
+
+    path = tmp_path / "output.txt"
+    path.write_text("\n".join(lines) + "\n")
+    assert list(parser.parse_file(str(path), keys=["energy", "volume"], first=True)) == results
+    assert list(parser.parse_file(str(path), sparse=True, keys=["volume", "total"], first=True)) == \
+        list(parser.parse(lines, sparse=True, keys=["volume", "total"], first=True))
+
+    # both entry points refuse first occurrences without keys as soon as they are called
+    with pytest.raises(ValueError):
+        parser.parse(lines, first=True)
+    with pytest.raises(ValueError):
+        parser.parse_file(str(tmp_path / "missing.txt"), first=True)
+
+
+def test_parse_last(tmp_path):
+    """Test that the last block of each rule is found searching backwards, skipping a cut-off one"""
+    parser = _values_parser()
+    text = "values:\n1\n2\ntotal 3\n" + "filler\n" * 1000 + "values:\n4\n5\ntotal 6\nfiller\nvalues:\n7\n"
+    path = tmp_path / "output.txt"
+    path.write_text(text)
+
+    for block_size in (1 << 20, 16):
+        assert parser.parse_last(str(path), block_size=block_size) == {"values": [4, 5], "total": 6}
+    assert parser.parse_last(str(path), keys=["total"], block_size=16) == {"total": 6}
+
+    # rules without keys of their own are searched only until the requested keys are found
+    parser.add_rule((lambda x: x.startswith("filler"), lambda line, lines: {"filler": True}))
+    assert parser.parse_last(str(path), keys=["total"], block_size=16) == {"total": 6}
+    assert parser.parse_last(str(path)) == {"values": [4, 5], "total": 6, "filler": True}
+
+    compressed = tmp_path / "output.txt.gz"
+    compressed.write_bytes(gzip.compress(text.rpartition("values:")[0].encode()))
+    assert parser.parse_last(str(compressed), keys=["values", "total"]) == {"values": [4, 5], "total": 6}
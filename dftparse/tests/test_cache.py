@@ -0,0 +1,130 @@
+import os
+from functools import partial
+
+from dftparse.cache import ParseCache, rules_fingerprint
+from dftparse.core import BlockParser
+from dftparse.vasp.outcar_parser import OutcarParser
+
+
+def _write_outcar(path, volume):
+    path.write_text("  volume of cell :       {:.2f}\n".format(volume))
+    return str(path)
+
+
+def test_cache_hit(tmp_path):
+    """Test that a cache hit returns the stored results without parsing again"""
+    cache = ParseCache(str(tmp_path / "cache"))
+    path = _write_outcar(tmp_path / "OUTCAR", 22.75)
+    parser = OutcarParser()
+    results = cache.parse_file(parser, path, sparse=True)
+    assert results[0].block == {"volume of cell": 22.75}
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("Parsed despite a cache hit")
+    parser.parse_file = _fail
+    assert cache.parse_file(parser, path, sparse=True) == results
+
+
+def test_cache_invalidation(tmp_path):
+    """Test that changing the file, the options or the rules misses the cache"""
+    cache = ParseCache(str(tmp_path / "cache"))
+    path = _write_outcar(tmp_path / "OUTCAR", 22.75)
+    parser = OutcarParser()
+    key = cache.key(parser, path, sparse=True)
+    assert cache.key(parser, path, sparse=False) != key
+
+    parser.add_rule(("energy-cutoff", lambda line, lines: {"cutoff": float(line.split()[-1])}))
+    assert cache.key(parser, path, sparse=True) != key
+
+    _write_outcar(tmp_path / "OUTCAR", 1022.75)
+    os.utime(path, (0, 0))
+    assert cache.parse_file(OutcarParser(), path)[0] == {"volume of cell": 1022.75}
+
+
+def test_rules_fingerprint():
+    """Test that the fingerprint follows the extractor code, not its identity"""
+    def _first(line, lines):
+        return {"a": 1}
+
+    def _second(line, lines):
+        return {"a": 2}
+
+    def _same(line, lines):
+        return {"a": 1}
+    _same.__qualname__ = _first.__qualname__
+
+    assert rules_fingerprint([("a", _first)]) == rules_fingerprint([("a", _same)])
+    assert rules_fingerprint([("a", _first)]) != rules_fingerprint([("a", _second)])
+    assert rules_fingerprint([("a", _first)]) != rules_fingerprint([("b", _first)])
+    assert rules_fingerprint(BlockParser().rules) == rules_fingerprint([])
+
+
+def _scaled(factor, line, lines):
+    return {"a": factor * float(line.split()[-1])}
+
+
+def _scaling(factor):
+    def _extract(line, lines):
+        return {"a": factor * float(line.split()[-1])}
+    return _extract
+
+
+def test_rules_fingerprint_bound_values():
+    """Test that the fingerprint follows the values bound to an extractor by a partial, a closure or a default"""
+    def _default(line, lines, factor=1.0):
+        return {"a": factor * float(line.split()[-1])}
+
+    def _other_default(line, lines, factor=2.0):
+        return {"a": factor * float(line.split()[-1])}
+    _other_default.__qualname__ = _default.__qualname__
+
+    assert rules_fingerprint([("a", partial(_scaled, 1.0))]) == rules_fingerprint([("a", partial(_scaled, 1.0))])
+    assert rules_fingerprint([("a", partial(_scaled, 1.0))]) != rules_fingerprint([("a", partial(_scaled, 2.0))])
+    assert rules_fingerprint([("a", _scaling(1.0))]) == rules_fingerprint([("a", _scaling(1.0))])
+    assert rules_fingerprint([("a", _scaling(1.0))]) != rules_fingerprint([("a", _scaling(2.0))])
+    assert rules_fingerprint([("a", _default)]) != rules_fingerprint([("a", _other_default)])
+
+
+def test_cache_corrupt_entry(tmp_path):
+    """Test that an entry that cannot be unpickled is parsed again"""
+    cache = ParseCache(str(tmp_path / "cache"))
+    path = _write_outcar(tmp_path / "OUTCAR", 22.75)
+    parser = OutcarParser()
+    entry = cache._entry(cache.key(parser, path))
+    os.makedirs(os.path.dirname(entry))
+    for corrupt in (b"cdftparse.core\nNoSuchName\n.", b"\x80\x05K", b"garbage"):
+        with open(entry, "wb") as f:
+            f.write(corrupt)
+        assert cache.parse_file(parser, path)[0] == {"volume of cell": 22.75}
+
+
+def test_cache_eviction(tmp_path):
+    """Test that the least recently used entries are evicted first"""
+    cache = ParseCache(str(tmp_path / "cache"), max_size=0)
+    path = _write_outcar(tmp_path / "OUTCAR", 22.75)
+    cache.parse_file(OutcarParser(), path)
+    assert not any(files for _, _, files in os.walk(str(tmp_path / "cache")))
+
+    cache.max_size = 1 << 20
+    for sparse in (True, False):
+        cache.parse_file(OutcarParser(), path, sparse=sparse)
+    assert sum(len(files) for _, _, files in os.walk(str(tmp_path / "cache"))) == 2
+    cache.clear()
+    assert not any(files for _, _, files in os.walk(str(tmp_path / "cache")))
+
+
+def test_cache_size_tally(tmp_path, monkeypatch):
+    """Test that the directory is walked on the first write and then only when it grows over max_size"""
+    walks = []
+    walk = os.walk
+    monkeypatch.setattr(os, "walk", lambda *args: walks.append(args) or walk(*args))
+    cache = ParseCache(str(tmp_path / "cache"), max_size=1 << 20)
+    paths = [_write_outcar(tmp_path / "OUTCAR{}".format(i), 20.0 + i) for i in range(10)]
+    for path in paths:
+        cache.parse_file(OutcarParser(), path)
+    assert len(walks) == 1
+
+    cache.max_size = cache._size - 1
+    cache.parse_file(OutcarParser(), paths[0], sparse=True)
+    assert len(walks) == 2
+    assert cache._size <= cache.max_size
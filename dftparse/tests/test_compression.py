@@ -0,0 +1,85 @@
+import bz2
+import gzip
+import io
+import lzma
+
+import pytest
+
+from dftparse.compression import detect_compression, iter_lines
+from dftparse.vasp.outcar_parser import OutcarParser
+
+OUTCAR = """ vasp.5.4.4.18Apr17-6-g9f103f2a35 (build Sep 18 2018 16:57:57) complex
+  volume of cell :      160.19
+ number of electron      31.9999995 magnetization       2.0000036
+ augmentation part        3.2146523 magnetization       0.1000000
+  volume of cell :      161.02
+"""
+
+
+class _Unseekable(io.RawIOBase):
+    """Binary stream that can only be read forwards, like a pipe"""
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self.data.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def _zstd_compress(data):
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.mark.parametrize("compress, name", [
+    (gzip.compress, "gzip"), (bz2.compress, "bz2"), (lzma.compress, "xz"), (_zstd_compress, "zstd"),
+])
+def test_parse_file_compressed(tmp_path, compress, name):
+    """Test that compressed files are detected by content and parse like the plain file"""
+    plain = tmp_path / "OUTCAR"
+    plain.write_text(OUTCAR)
+    compressed = tmp_path / "OUTCAR.backup"
+    compressed.write_bytes(compress(OUTCAR.encode()))
+    assert detect_compression(compressed.read_bytes()) == name
+
+    parser = OutcarParser()
+    for sparse in (False, True):
+        expected = list(parser.parse_file(str(plain), sparse=sparse))
+        assert list(parser.parse_file(str(compressed), sparse=sparse)) == expected
+    assert list(parser.parse_file(str(compressed), keys=["volume of cell"], first=True)) == [
+        {}, {"volume of cell": 160.19}
+    ]
+
+
+def test_plain_text_starting_like_bzip2(tmp_path):
+    """Test that text starting with "BZh" but no block size is not taken for bzip2"""
+    assert detect_compression(bz2.compress(b"", 1)) == "bz2"
+    assert detect_compression(b"BZh") is None
+    text = "BZh, the header of a plain file\n" + OUTCAR
+    path = tmp_path / "OUTCAR"
+    path.write_text(text)
+    assert detect_compression(path.read_bytes()) is None
+    expected = list(OutcarParser().parse(text.splitlines(True), sparse=True))
+    assert list(OutcarParser().parse_file(str(path), sparse=True)) == expected
+
+
+def test_parse_file_objects():
+    """Test that binary file objects, seekable or not, parse whether compressed or not"""
+    parser = OutcarParser()
+    expected = list(parser.parse(OUTCAR.splitlines(True), sparse=True))
+    for data in (OUTCAR.encode(), gzip.compress(OUTCAR.encode())):
+        assert list(parser.parse_file(io.BytesIO(data), sparse=True)) == expected
+        assert list(parser.parse_file(_Unseekable(data), sparse=True)) == expected
+        assert list(parser.parse(io.BufferedReader(_Unseekable(data)), sparse=True)) == expected
+
+
+def test_iter_lines_blocks():
+    """Test that lines split across blocks are reassembled and decoded like parse_file does"""
+    data = gzip.compress(b"first line\r\nsecond, longer line\n\xffthird\nno newline")
+    lines = list(iter_lines(io.BytesIO(data), block_size=4))
+    assert lines == ["first line\n", "second, longer line\n", "�third\n", "no newline"]
@@ -0,0 +1,52 @@
+from dftparse.instrument import ParseProfile
+from dftparse.pwscf.stdout_parser import PwscfStdOutputParser
+
+TEXT = """
+     Program PWSCF v.6.1 (svn rev. 13591M) starts on 12Jul2017 at 10:17:52
+     Forces acting on atoms (Ry/au):
+
+     atom    1 type  1   force =   0.00000000  0.00000000   0.00000000
+     atom    2 type  2   force =   0.00000000  0.00000000   0.00000054
+
+     Total force =     0.011752   Total SCF correction =     0.000072
+"""
+LINES = TEXT.splitlines(True)
+
+
+def _rule_report(report, name):
+    return [r for r in report["rules"] if r["rule"] == name][0]
+
+
+def test_profile_parse(tmp_path):
+    """Test that profiling records per-rule hits, lines and input size, for lines and files"""
+    parser = PwscfStdOutputParser()
+    parser.profile = ParseProfile()
+    plain = list(PwscfStdOutputParser().parse(LINES))
+    assert list(parser.parse(LINES)) == plain
+
+    report = parser.profile.report()
+    assert report["lines"] == len(LINES)
+    assert report["bytes"] == sum(len(line) for line in LINES)
+    forces = _rule_report(report, "_parse_forces")
+    assert forces["hits"] == 1
+    assert forces["lines consumed"] == 5
+    assert forces["trigger"] == "Forces acting on atoms"
+    assert _rule_report(report, "_parse_header")["hits"] == 1
+    assert _rule_report(report, "_parse_warning")["hits"] == 0
+
+    parser.profile.reset()
+    path = tmp_path / "pw.out"
+    path.write_text(TEXT)
+    assert list(parser.parse_file(str(path))) == plain
+    report = parser.profile.report()
+    assert report["lines"] == len(LINES)
+    assert report["bytes"] == path.stat().st_size
+    assert _rule_report(report, "_parse_forces")["lines consumed"] == 5
+    assert report["trigger search calls"] > 0
+
+
+def test_profile_disabled():
+    """Test that parsers are not instrumented by default"""
+    parser = PwscfStdOutputParser()
+    assert parser.profile is None
+    assert all(a is b for a, b in zip(parser._prepare(), parser.rules))
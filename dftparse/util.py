@@ -4,6 +4,9 @@
 def remove_empty_dicts(iter_of_dicts):
     """Remove empty dictionaries from an iterable of dicts.
 
+    Consider ``BlockParser.parse(..., sparse=True)``, which never produces the
+    empty dicts in the first place.
+
     :param iter_of_dicts: iterable of dicts
     :return: iterable with empty dicts removed
     """
@@ -1,3 +1,8 @@
+import io
+from functools import partial
+from itertools import chain
+
+from ..compression import open_decompressed
 from ..core import BlockParser
 
 
@@ -70,15 +75,146 @@ def _parse_kpoint(line, lines):
       
     return res
 
+def _next_nonblank(lines):
+    newline = next(lines)
+    while not newline.strip():
+        newline = next(lines)
+    return newline
+
+
+def _read_header(lines):
+    """Read the header: ISPIN is the 4th number of the first line, NKPTS and NBANDS the 2nd and 3rd of the 6th"""
+    ispin = int(_next_nonblank(lines).split()[3])
+    for _ in range(5):
+        newline = next(lines)
+    toks = newline.split()
+    return {
+        "number of spins": ispin,
+        "number of electrons": float(toks[0]),
+        "number of k-points": int(toks[1]),
+        "number of bands": int(toks[2]),
+    }
+
+
+def _has_occupancies(row, ispin):
+    """Whether a band row lists occupancies, from its number of columns and ISPIN"""
+    columns = len(row.split())
+    if columns not in (1 + ispin, 1 + 2 * ispin):
+        raise ValueError("Encountered {} when parsing a band with ISPIN={}".format(row, ispin))
+    return columns == 1 + 2 * ispin
+
+
+def _walk_kpoints(lines, header):
+    """Yield the k-point dicts of _parse_kpoint, reading exactly the blocks the header announces"""
+    ispin = header["number of spins"]
+    for _ in range(header["number of k-points"]):
+        toks = _next_nonblank(lines).split()
+        energies = []
+        occupancies = []
+        for _ in range(header["number of bands"]):
+            values = [float(x) for x in next(lines).split()[1:]]
+            energies.append(tuple(values[:ispin]))
+            if len(values) > ispin:
+                occupancies.append(tuple(values[ispin:]))
+        res = {"kpoint": [float(x) for x in toks[:3]], "weight": float(toks[3]), "energies": energies}
+        if occupancies:
+            res["occupancies"] = occupancies
+        yield res
+
+
+def _batches(lines, size=4096):
+    """Join lines into pieces of text of ``size`` lines"""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield " ".join(batch) + " "
+            batch = []
+    yield " ".join(batch)
+
+
+def _read_arrays(header, occupancies, pieces):
+    """Read the numbers of all k-point blocks at once into arrays"""
+    from ..arrays import np, read_floats
+
+    nkpts, nbands, ispin = header["number of k-points"], header["number of bands"], header["number of spins"]
+    columns = 1 + ispin * (2 if occupancies else 1)
+    width = 4 + nbands * columns
+    values = read_floats(pieces, nkpts * width).reshape(nkpts, width)
+    bands = values[:, 4:].reshape(nkpts, nbands, columns)
+    if not np.array_equal(bands[:, :, 0], np.broadcast_to(np.arange(1, nbands + 1), (nkpts, nbands))):
+        raise ValueError("The k-point blocks do not match the layout stated in the header")
+
+    res = {
+        "kpoints": np.ascontiguousarray(values[:, :3]),
+        "weights": np.ascontiguousarray(values[:, 3]),
+        "energies": np.ascontiguousarray(bands[:, :, 1:1 + ispin]),
+    }
+    if occupancies:
+        res["occupancies"] = np.ascontiguousarray(bands[:, :, 1 + ispin:])
+    return res
+
+
 # The only rule pulls out k-points and the energies (and optionally occupations) at them
 base_rules = [
-  (_is_kpoint, _parse_kpoint)
+  (_is_kpoint, _parse_kpoint, ("kpoint", "weight", "energies", "occupancies"))
 ]
 
 class EigenvalParser(BlockParser):
-    """Parser for VASP's EIGENVAL files"""
+    """Parser for VASP's EIGENVAL files.
+
+    Besides the rule-based :meth:`parse`, which sniffs every line for a
+    k-point, the header-driven methods read ISPIN, NKPTS and NBANDS from the
+    header and walk the fixed layout of the k-point blocks that follows.
+    """
     def __init__(self, rules=base_rules):
         BlockParser.__init__(self)
         for rule in rules:
             self.add_rule(rule)
 
+    @staticmethod
+    def parse_kpoints(generator):
+        """Parse the lines of an EIGENVAL by its header into one dict per k-point, as :meth:`parse` does.
+
+        :param generator: iterable source of strings
+        :return: generator of dicts with "kpoint", "weight", "energies" and, if
+            the file lists them, "occupancies"
+        """
+        lines = iter(generator)
+        header = _read_header(lines)
+        return _walk_kpoints(lines, header)
+
+    @staticmethod
+    def parse_arrays(generator):
+        """Parse the lines of an EIGENVAL by its header into NumPy arrays (requires NumPy).
+
+        The arrays are preallocated from the header and all numbers are
+        converted in bulk.
+
+        :param generator: iterable source of strings
+        :return: dict of float64 arrays: "kpoints" (nk, 3), "weights" (nk,),
+            "energies" (nk, nbands, nspin) and, if the file lists them,
+            "occupancies" (nk, nbands, nspin)
+        """
+        lines = iter(generator)
+        header = _read_header(lines)
+        kpoint = _next_nonblank(lines)
+        row = next(lines)
+        occupancies = _has_occupancies(row, header["number of spins"])
+        return _read_arrays(header, occupancies, chain([kpoint + " " + row + " "], _batches(lines)))
+
+    @staticmethod
+    def parse_file_arrays(path, encoding='utf-8', block_size=1 << 20):
+        """Parse an EIGENVAL file (or binary file object, possibly compressed) into arrays, as :meth:`parse_arrays`.
+
+        The numbers are converted straight from blocks of ``block_size`` bytes, without splitting lines.
+        """
+        with open_decompressed(path) as stream:
+            text = io.StringIO(stream.read(block_size).decode(encoding, 'replace'))
+            header = _read_header(text)
+            position = text.tell()
+            _next_nonblank(text)
+            occupancies = _has_occupancies(next(text), header["number of spins"])
+            text.seek(position)
+            blocks = (block.decode(encoding, 'replace') for block in iter(partial(stream.read, block_size), b''))
+            return _read_arrays(header, occupancies, chain([text.read()], blocks))
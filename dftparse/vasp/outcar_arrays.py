@@ -0,0 +1,88 @@
+"""Array rules and ionic trajectory assembly for OUTCAR files (requires NumPy)."""
+from ..arrays import GrowableArray, np, parse_floats
+
+
+def _parse_positions_and_forces(line, lines):
+    """Parse the POSITION / TOTAL-FORCE table in bulk into (natoms, 3) arrays"""
+    next(lines)
+    rows = []
+    newline = next(lines)
+    while not newline.lstrip().startswith('--'):
+        rows.append(newline)
+        newline = next(lines)
+    values = parse_floats(rows, 6)
+    return {"positions": values[:, :3], "forces": values[:, 3:]}
+
+
+def _parse_lattice_vectors(line, lines):
+    """Parse the direct lattice vectors, the first three columns of the next three lines"""
+    values = parse_floats([next(lines) for _ in range(3)], 6)
+    return {"lattice vectors": values[:, :3]}
+
+
+def _parse_stress(line, lines):
+    """Parse the stress in kB, listed as XX YY ZZ XY YZ ZX, into a (3, 3) array"""
+    xx, yy, zz, xy, yz, zx = [float(x) for x in line.split()[2:8]]
+    return {"stress": np.array([[xx, xy, zx], [xy, yy, yz], [zx, yz, zz]])}
+
+
+def _parse_free_energy(line, lines):
+    return {"free energy": float(line.partition('=')[2].split()[0])}
+
+
+def _parse_energy_without_entropy(line, lines):
+    toks = line.split('=')
+    return {
+        "energy without entropy": float(toks[1].split()[0]),
+        "energy(sigma->0)": float(toks[2]),
+    }
+
+
+# Rules of the final values of each ionic step (of the ML force field, too)
+array_rules = [
+    ("TOTAL-FORCE (eV/Angst)", _parse_positions_and_forces, ("positions", "forces")),
+    ("direct lattice vectors", _parse_lattice_vectors, ("lattice vectors",)),
+    ("  in kB ", _parse_stress, ("stress",)),
+    (("free  energy   TOTEN", "free  energy ML TOTEN"), _parse_free_energy, ("free energy",)),
+    ("energy  without entropy", _parse_energy_without_entropy, ("energy without entropy", "energy(sigma->0)")),
+]
+
+TRAJECTORY_KEYS = (
+    "positions", "forces", "lattice vectors", "stress", "free energy", "energy without entropy", "energy(sigma->0)",
+)
+# quantities that hold until they are printed again, rather than belonging to one step
+_PERSISTENT = ("lattice vectors",)
+
+
+def assemble_trajectory(blocks):
+    """Group the blocks of the array rules into ionic steps, stored column by column.
+
+    A step ends with its "energy  without entropy" line; the lattice vectors
+    are the last ones printed before that, and quantities a step does not
+    print are NaN.
+
+    :param blocks: iterable of the dicts produced by :data:`array_rules`
+    :return: dict of float64 arrays: "positions" and "forces" (nsteps, natoms, 3),
+        "lattice vectors" and "stress" (nsteps, 3, 3), "free energy",
+        "energy without entropy" and "energy(sigma->0)" (nsteps,); quantities
+        never printed are left out
+    """
+    columns = {key: GrowableArray() for key in TRAJECTORY_KEYS}
+    current = {}
+    for block in blocks:
+        current.update(block)
+        if "energy without entropy" not in block:
+            continue
+        for key, column in columns.items():
+            if key in current:
+                column.append(current[key])
+            else:
+                column.append_missing()
+        current = {key: current[key] for key in _PERSISTENT if key in current}
+
+    trajectory = {}
+    for key, column in columns.items():
+        array = column.array()
+        if array is not None:
+            trajectory[key] = array
+    return trajectory
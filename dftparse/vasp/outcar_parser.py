@@ -13,9 +13,10 @@ def _parse_volume_of_cell(line, lines):
     """Parse the volume of the unit cell"""
     return {"volume of cell": float(line.split()[4])}
 
+# (trigger, extractor, keys the extractor can produce)
 base_rules = [
-    (lambda x: " number of electron " in x, _parse_total_magnetization),
-    (lambda x: " volume of cell " in x, _parse_volume_of_cell)
+    (" number of electron ", _parse_total_magnetization, ("number of electrons", "total magnetization")),
+    (" volume of cell ", _parse_volume_of_cell, ("volume of cell",))
 ]
 
 
@@ -26,3 +27,17 @@ class OutcarParser(BlockParser):
         BlockParser.__init__(self)
         for rule in rules:
             self.add_rule(rule)
+
+    def parse_trajectory(self, generator):
+        """Parse the lines of an OUTCAR into arrays of its ionic steps (requires NumPy).
+
+        See :func:`dftparse.vasp.outcar_arrays.assemble_trajectory` for the arrays returned.
+        """
+        from .outcar_arrays import array_rules, assemble_trajectory
+        return assemble_trajectory(match.block for match in self._sub_parser(array_rules).parse(generator, sparse=True))
+
+    def parse_file_trajectory(self, path, encoding='utf-8'):
+        """Parse an OUTCAR file into arrays of its ionic steps, as :meth:`parse_trajectory` would its lines"""
+        from .outcar_arrays import array_rules, assemble_trajectory
+        matches = self._sub_parser(array_rules).parse_file(path, sparse=True, encoding=encoding)
+        return assemble_trajectory(match.block for match in matches)
@@ -1,3 +1,8 @@
+import gzip
+import io
+
+import pytest
+
 from dftparse.vasp.eigenval_parser import EigenvalParser
 
 
@@ -179,3 +184,71 @@ def test_ispin_occ():
 
     # Test that the sum of the occupancies is about 24
     assert all(abs(sum(x[0] + x[1] for x in res['occupancies']) - 24.0) < 0.5 for res in results)
+
+
+EIGENVAL_ISPIN_OCC = """    4    4   10    2
+  0.1363242E+02  0.3439000E-09  0.3439000E-09  0.5324000E-09  0.5000000E-15
+  1.000000000000000E-004
+  CAR
+ CrS, AF, PAW
+     24      2      3
+
+  0.2500000E+00  0.2500000E+00  0.2500000E+00  0.3333333E+00
+    1       -5.646207     -5.646219   1.000000   1.000000
+    2        8.244856      8.245175   1.000457   1.000461
+    3        9.195638      9.196664  -0.006644  -0.006529
+
+  0.5000000E+00 -0.2500000E+00  0.2500000E+00  0.1666667E+00
+    1       -5.647831     -5.647830   1.000000   1.000000
+    2        8.245817      8.245826   1.000468   1.000468
+    3        9.195340      9.195341  -0.006677  -0.006677
+"""
+
+
+def test_parse_arrays(tmp_path):
+    """Test that the array mode matches the list-of-dicts output"""
+    np = pytest.importorskip("numpy")
+    lines = EIGENVAL_ISPIN_OCC.split("\n")
+    dicts = [x for x in EigenvalParser().parse(lines) if len(x) > 0]
+    arrays = EigenvalParser().parse_arrays(lines)
+
+    assert arrays["energies"].shape == (2, 3, 2)
+    assert arrays["energies"].flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(arrays["kpoints"], [d["kpoint"] for d in dicts])
+    np.testing.assert_array_equal(arrays["weights"], [d["weight"] for d in dicts])
+    np.testing.assert_array_equal(arrays["energies"], [d["energies"] for d in dicts])
+    np.testing.assert_array_equal(arrays["occupancies"], [d["occupancies"] for d in dicts])
+
+    # the last k-point may end the file without a blank line
+    path = tmp_path / "EIGENVAL"
+    path.write_text(EIGENVAL_ISPIN_OCC)
+    from_file = EigenvalParser().parse_file_arrays(str(path))
+    for key in arrays:
+        np.testing.assert_array_equal(from_file[key], arrays[key])
+
+
+def test_parse_kpoints():
+    """Test that the header-driven walk matches parse and finds k-points the line sniffing misses"""
+    lines = EIGENVAL_ISPIN_OCC.split("\n")
+    expected = [x for x in EigenvalParser().parse(lines) if len(x) > 0]
+    assert list(EigenvalParser.parse_kpoints(lines)) == expected
+
+    # a k-point outside of [-0.5, 0.5], e.g. on a band structure path
+    shifted = EIGENVAL_ISPIN_OCC.replace("0.5000000E+00 -0.2500000E+00", "0.7500000E+00 -0.2500000E+00")
+    assert len([x for x in EigenvalParser().parse(shifted.split("\n")) if len(x) > 0]) == 1
+    kpoints = list(EigenvalParser.parse_kpoints(shifted.split("\n")))
+    assert kpoints[1]["kpoint"] == [0.75, -0.25, 0.25]
+    assert kpoints[1]["energies"] == expected[1]["energies"]
+
+
+def test_parse_file_arrays_blocks():
+    """Test that numbers split across blocks of a compressed file are read whole"""
+    np = pytest.importorskip("numpy")
+    arrays = EigenvalParser.parse_arrays(EIGENVAL_ISPIN_OCC.split("\n"))
+    stream = io.BytesIO(gzip.compress(EIGENVAL_ISPIN_OCC.encode()))
+    from_blocks = EigenvalParser.parse_file_arrays(stream, block_size=500)
+    for key in arrays:
+        np.testing.assert_array_equal(from_blocks[key], arrays[key])
+
+    with pytest.raises(ValueError):
+        EigenvalParser.parse_arrays(EIGENVAL_ISPIN_OCC.replace("     24      2      3", "     24      2      2").split("\n"))
@@ -1,3 +1,5 @@
+import pytest
+
 from dftparse.vasp.outcar_parser import OutcarParser
 
 
@@ -32,3 +34,70 @@ def test_parse_volume_of_cell():
     """.split("\n")
     res = _flatten(OutcarParser().parse(lines))
     assert res["volume of cell"] == 22.75, "Parsed the volume of cell incorrectly"
+
+
+OUTCAR_STEP = """
+  FORCE on cell =-STRESS in cart. coord.  units (eV):
+  Direction    XX          YY          ZZ          XY          YZ          ZX
+  --------------------------------------------------------------------------------------
+  Total     -0.71536    -0.71536    -0.71536     0.00000     0.00000    -0.00000
+  in kB      -7.16158    -6.16158    -5.16158     1.00000     2.00000    -3.00000
+  external pressure =       -6.16 kB  Pullay stress =        0.00 kB
+
+ VOLUME and BASIS-vectors are now :
+ -----------------------------------------------------------------------------
+  energy-cutoff  :      400.00
+  volume of cell :      160.19
+      direct lattice vectors                 reciprocal lattice vectors
+     5.431000000  0.000000000  0.000000000     0.184128153  0.000000000  0.000000000
+     0.000000000  5.431000000  0.000000000     0.000000000  0.184128153  0.000000000
+     0.000000000  0.000000000  {c}     0.000000000  0.000000000  0.184128153
+
+ POSITION                                       TOTAL-FORCE (eV/Angst)
+ -----------------------------------------------------------------------------------
+      0.00000      0.00000      0.00000         0.000000      0.000000      {f}
+      1.35775      1.35775      1.35775        -0.000000     -0.000000     -0.100000
+ -----------------------------------------------------------------------------------
+    total drift:                               -0.000000     -0.000000      0.000000
+
+  FREE ENERGIE OF THE ION-ELECTRON SYSTEM (eV)
+  ---------------------------------------------------
+  free  energy   TOTEN  =       {e} eV
+
+  energy  without entropy=      -10.84508284  energy(sigma->0) =      -10.84508285
+"""
+
+
+def test_parse_trajectory(tmp_path):
+    """Test that ionic steps are assembled into arrays, from lines or a file"""
+    np = pytest.importorskip("numpy")
+    text = "".join(OUTCAR_STEP.format(c="{:.9f}".format(5.4 + i), f="{:.6f}".format(0.1 * i),
+                                      e="{:.8f}".format(-10.8 - i)) for i in range(3))
+    trajectory = OutcarParser().parse_trajectory(text.split("\n"))
+    assert trajectory["positions"].shape == (3, 2, 3)
+    np.testing.assert_allclose(trajectory["forces"][:, 0, 2], [0.0, 0.1, 0.2])
+    np.testing.assert_allclose(trajectory["lattice vectors"][:, 2, 2], [5.4, 6.4, 7.4])
+    np.testing.assert_allclose(trajectory["free energy"], [-10.8, -11.8, -12.8])
+    np.testing.assert_allclose(trajectory["energy(sigma->0)"], [-10.84508285] * 3)
+    np.testing.assert_allclose(trajectory["stress"][0], [[-7.16158, 1.0, -3.0], [1.0, -6.16158, 2.0],
+                                                         [-3.0, 2.0, -5.16158]])
+
+    path = tmp_path / "OUTCAR"
+    path.write_text(text)
+    from_file = OutcarParser().parse_file_trajectory(str(path))
+    assert sorted(from_file) == sorted(trajectory)
+    for key in trajectory:
+        np.testing.assert_array_equal(from_file[key], trajectory[key])
+
+
+def test_parse_trajectory_missing():
+    """Test that a quantity a step does not print is NaN"""
+    np = pytest.importorskip("numpy")
+    first = OUTCAR_STEP.format(c="5.431000000", f="0.000000", e="-10.8")
+    # no stress and no lattice vectors in the first step
+    head, _, tail = first.partition(" VOLUME and BASIS")
+    second = head.replace("in kB", "in kb") + " POSITION " + tail.partition(" POSITION ")[2]
+    trajectory = OutcarParser().parse_trajectory((second + first).split("\n"))
+    assert np.isnan(trajectory["stress"][0]).all()
+    assert not np.isnan(trajectory["stress"][1]).any()
+    assert np.isnan(trajectory["lattice vectors"][0]).all()
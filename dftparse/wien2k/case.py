@@ -0,0 +1,126 @@
+"""All the output files of a Wien2k case, found by the case name and parsed concurrently on demand."""
+import os
+from collections.abc import Mapping
+from multiprocessing import Pool
+
+from .absorp_parser import AbsorpParser
+from .eloss_parser import ElossParser
+from .epsilon_parser import EpsilonParser
+from .reflectivity_parser import ReflectivityParser
+from .refract_parser import RefractionParser
+from .scf2_parser import Scf2Parser
+from .scf_parser import ScfParser
+from .sigmak_parser import SigmakParser
+
+# file extension of each output, after "case.", and the parser of the file
+SECTIONS = (
+    ("scf", ScfParser),
+    ("scf2", Scf2Parser),
+    ("epsilon", EpsilonParser),
+    ("sigmak", SigmakParser),
+    ("absorp", AbsorpParser),
+    ("refract", RefractionParser),
+    ("reflectivity", ReflectivityParser),
+    ("eloss", ElossParser),
+)
+
+# suffixes of the compressed files BlockParser.parse_file decompresses
+_COMPRESSED = ("", ".gz", ".bz2", ".xz", ".zst")
+
+
+def find_case(directory, case=None):
+    """Find the output files of a Wien2k case.
+
+    :param directory: directory of the case
+    :param case: name of the case; None for the name of the directory, as Wien2k sets it up
+    :return: dict of the path of each file present, keyed by extension, in the order of :data:`SECTIONS`;
+        an uncompressed file is preferred over a compressed one
+    """
+    if case is None:
+        case = os.path.basename(os.path.normpath(os.path.abspath(directory)))
+    res = {}
+    for extension, _ in SECTIONS:
+        for suffix in _COMPRESSED:
+            path = os.path.join(directory, "{}.{}{}".format(case, extension, suffix))
+            if os.path.isfile(path):
+                res[extension] = path
+                break
+    return res
+
+
+def _parse_section(task):
+    parser_class, path, arrays, encoding = task
+    parser = parser_class()
+    if arrays and hasattr(parser, "parse_file_arrays"):
+        return parser.parse_file_arrays(path, encoding)
+    if arrays and hasattr(parser, "parse_file_history"):
+        return parser.parse_file_history(path, encoding)
+    return [match.block for match in parser.parse_file(path, sparse=True, encoding=encoding)]
+
+
+class Wien2kCase(Mapping):
+    """The parsed output files of a Wien2k case, keyed by extension, e.g. ``case["epsilon"]``.
+
+    The files present are found when the case is created, but each one is
+    only parsed when its section is first accessed, and then kept.
+    :meth:`load` parses several sections at once in a process pool.
+
+    Sections are the list of blocks of the file, as produced by
+    :meth:`BlockParser.parse` with ``sparse=True``.  With ``arrays``
+    (requires NumPy) the optics tables are the arrays of
+    :meth:`TableParser.parse_file_arrays` and the .scf file the history of
+    :meth:`ScfParser.parse_file_history` instead.
+    """
+
+    def __init__(self, directory, case=None, arrays=False, encoding='utf-8'):
+        """
+        :param directory: directory of the case
+        :param case: name of the case, as for :func:`find_case`
+        :param arrays: parse into arrays rather than lists of blocks
+        :param encoding: passed on to the parsers
+        """
+        self.paths = find_case(directory, case)
+        self.arrays = arrays
+        self.encoding = encoding
+        self._sections = {}
+
+    def _task(self, extension):
+        return dict(SECTIONS)[extension], self.paths[extension], self.arrays, self.encoding
+
+    def __getitem__(self, extension):
+        if extension not in self._sections:
+            self._sections[extension] = _parse_section(self._task(extension))
+        return self._sections[extension]
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def loaded(self, extension):
+        """Whether a section has been parsed already"""
+        return extension in self._sections
+
+    def load(self, extensions=None, processes=None):
+        """Parse sections not parsed yet concurrently, one file per worker process.
+
+        :param extensions: sections to parse; None for all of them
+        :param processes: number of worker processes (None for one per CPU)
+        :return: this case
+        """
+        if extensions is None:
+            extensions = list(self.paths)
+        pending = [extension for extension in extensions if not self.loaded(extension)]
+        processes = min(processes or os.cpu_count() or 1, len(pending))
+        if processes <= 1:
+            # a single worker would only add the cost of sending the sections back
+            for extension in pending:
+                self[extension]
+            return self
+        # the largest files first, so that they do not finish last
+        pending.sort(key=lambda extension: os.path.getsize(self.paths[extension]), reverse=True)
+        with Pool(processes) as pool:
+            for extension, section in zip(pending, pool.imap(_parse_section, map(self._task, pending))):
+                self._sections[extension] = section
+        return self
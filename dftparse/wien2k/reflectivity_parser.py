@@ -1,27 +1,15 @@
-from ..core import BlockParser
+from .table import TableParser, table_rules
 
+# Energy [eV]  reflect_xx    reflect_zz
+COLUMNS = ("energy", "reflect_xx", "reflect_zz")
 
-def _parse_reflectivity(line, lines):
-    """Parse Energy [eV]  reflect_xx    reflect_zz"""
+base_rules = table_rules(COLUMNS, "_parse_reflectivity")
 
-    split_line = line.split()
 
-    energy = float(split_line[0])
-    reflect_xx = float(split_line[1])
-    reflect_zz = float(split_line[2])
-
-    return {"energy": energy, "reflect_xx": reflect_xx, "reflect_zz": reflect_zz}
-
-
-base_rules = [
-    (lambda x: len(x) > 0 and "#" not in x and len(x.split()) == 3, _parse_reflectivity)
-]
-
-
-class ReflectivityParser(BlockParser):
+class ReflectivityParser(TableParser):
     """Parser for Wien2k's .reflectivity file"""
 
+    columns = COLUMNS
+
     def __init__(self, rules=base_rules):
-        BlockParser.__init__(self)
-        for rule in rules:
-            self.add_rule(rule)
+        TableParser.__init__(self, rules)
@@ -10,7 +10,7 @@ def _parse_bandgap(line, lines):
 
 
 base_rules = [
-    (lambda x: ":GAP (global)" in x, _parse_bandgap)
+    (":GAP (global)", _parse_bandgap, ("band gap", "band gap units"))
 ]
 
 
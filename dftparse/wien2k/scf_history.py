@@ -0,0 +1,126 @@
+"""The whole iteration history of a Wien2k .scf file, every ``:XXX`` record of every iteration.
+
+Each record line starts with its label between colons, e.g. ``:FER  :`` or
+``:MMI001:``, where a trailing number indexes an atom.  The label alone
+selects how the values are read from the rest of the line.
+"""
+import re
+
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[EeDd][-+]?\d+)?')
+# three letters and the atom (or iteration) number
+_INDEXED = re.compile(r'([A-Z]{3})(\d+)$')
+
+
+def _numbers(text):
+    return tuple(float(x.replace('D', 'E').replace('d', 'e')) for x in _NUMBER.findall(text))
+
+
+def _default_values(text):
+    """The numbers after the last "=", or all numbers if there is none"""
+    return _numbers(text.rpartition('=')[2])
+
+
+def _last_value(text):
+    return _numbers(text)[-1:]
+
+
+def _atom_values(text):
+    """The numbers after the "n.ATOM" of a force line"""
+    return _numbers(text.partition('ATOM')[2])
+
+
+# readers of the values of the labels whose lines are not read by _default_values
+_VALUES = {
+    'DIS': _last_value,
+    'FOR': _atom_values,
+    'FGL': _atom_values,
+    'GAP': _numbers,
+    'GAP (global)': _numbers,
+    'RKM': _numbers,
+}
+
+
+def _split_label(label):
+    """Split a record label into its name and atom (or iteration) number, e.g. "MMI001" into ("MMI", 1)"""
+    match = _INDEXED.match(label)
+    if match is None:
+        return label, None
+    return match.group(1), int(match.group(2))
+
+
+def _parse_record(line, lines):
+    """Parse a ``:XXX`` record into its label and the tuple of its values"""
+    end = line.find(':', 1)
+    label = line[1:end].strip()
+    name, _ = _split_label(label)
+    return {label: _VALUES.get(name, _default_values)(line[end + 1:])}
+
+
+# One rule for every record: the label selects the reader of the values
+history_rules = [
+    (re.compile(r'^:[A-Z]'), _parse_record),
+]
+
+
+def _column(np, records, niterations):
+    """Array of the records of one label, one row per iteration, NaN where not printed"""
+    width = max(max(len(values) for _, _, values in records), 1)
+    indexed = any(index is not None for _, index, _ in records)
+    shape = (niterations,)
+    if indexed:
+        shape += (max(index or 1 for _, index, _ in records),)
+    if width != 1:
+        shape += (width,)
+    column = np.full(shape, np.nan)
+    for position, index, values in records:
+        key = (position, (index or 1) - 1) if indexed else position
+        if width == 1:
+            column[key] = values[0] if values else np.nan
+        else:
+            column[key][:len(values)] = values
+    return column
+
+
+class Wien2kScfHistory(object):
+    """Records of the iterations of a Wien2k .scf file, stored label by label.
+
+    Blocks of :data:`history_rules` are added one at a time, so records
+    appended to a .scf file by further iterations can be added as they
+    appear.  Records before the first ``:ITE`` line are ignored.
+    """
+
+    def __init__(self):
+        self._iterations = []
+        # ":XXX" label -> list of (iteration position, atom number or None, values)
+        self._records = {}
+
+    def add(self, block):
+        """Add a block of the history rules"""
+        for label, values in block.items():
+            name, index = _split_label(label)
+            if name == 'ITE':
+                self._iterations.append(index)
+            elif self._iterations:
+                self._records.setdefault(':' + name, []).append((len(self._iterations) - 1, index, values))
+
+    def extend(self, blocks):
+        """Add the blocks of an iterable"""
+        for block in blocks:
+            self.add(block)
+
+    def arrays(self):
+        """The history as arrays with one row per iteration (requires NumPy).
+
+        :return: dict of "iteration", the int64 iteration numbers, and of a
+            float64 array per label, e.g. ":FER" or ":GAP (global)", of shape
+            (niterations,) for labels with one value, (niterations, nvalues)
+            for labels with several, e.g. ":LAT", and (niterations, natoms[,
+            nvalues]) for labels numbered by atom, e.g. ":MMI" or ":FGL";
+            values that were not printed are NaN
+        """
+        from ..arrays import np
+
+        res = {'iteration': np.array(self._iterations, dtype=np.int64)}
+        for label, records in self._records.items():
+            res[label] = _column(np, records, len(self._iterations))
+        return res
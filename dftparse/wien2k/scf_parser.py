@@ -10,7 +10,8 @@ def _parse_total_energy(line, lines):
 
 
 base_rules = [
-    (lambda x: ":ENE" in x, _parse_total_energy)
+    # the space keeps ":ENERGY convergence" lines out
+    (":ENE ", _parse_total_energy, ("total energy", "total energy units"))
 ]
 
 
@@ -21,3 +22,21 @@ class ScfParser(BlockParser):
         BlockParser.__init__(self)
         for rule in rules:
             self.add_rule(rule)
+
+    def parse_history(self, generator):
+        """Parse the lines of a .scf file into arrays of every record of every iteration (requires NumPy).
+
+        See :meth:`dftparse.wien2k.scf_history.Wien2kScfHistory.arrays` for the arrays returned.
+        """
+        from .scf_history import Wien2kScfHistory, history_rules
+        history = Wien2kScfHistory()
+        history.extend(match.block for match in self._sub_parser(history_rules).parse(generator, sparse=True))
+        return history.arrays()
+
+    def parse_file_history(self, path, encoding='utf-8'):
+        """Parse a .scf file into arrays of its iterations, as :meth:`parse_history` would its lines"""
+        from .scf_history import Wien2kScfHistory, history_rules
+        history = Wien2kScfHistory()
+        matches = self._sub_parser(history_rules).parse_file(path, sparse=True, encoding=encoding)
+        history.extend(match.block for match in matches)
+        return history.arrays()
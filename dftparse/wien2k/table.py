@@ -0,0 +1,91 @@
+"""Shared engine of the Wien2k optics parsers, whose outputs are numeric tables under ``#`` header lines."""
+import re
+from functools import partial
+
+from ..compression import open_decompressed
+from ..core import BlockParser
+
+# leading blank and "#" lines
+_HEADER = re.compile(r'(?:[ \t]*(?:#[^\n]*)?\r?\n)*')
+# lines with something other than whitespace on them
+_ROW = re.compile(r'^[ \t]*\S', re.MULTILINE)
+
+
+def _is_row(ncolumns, line):
+    return len(line) > 0 and "#" not in line and len(line.split()) == ncolumns
+
+
+def _parse_row(columns, line, lines):
+    return dict(zip(columns, map(float, line.split())))
+
+
+def table_rules(columns, name='_parse_row'):
+    """Rules producing one dict per row of a table, keyed by its column names.
+
+    :param columns: names of the columns, in order
+    :param name: name of the rule, as shown in :class:`Match` tuples
+    """
+    # partials of module-level functions, so that the rules can be pickled
+    extract = partial(_parse_row, tuple(columns))
+    extract.__name__ = name
+    return [(partial(_is_row, len(columns)), extract, tuple(columns))]
+
+
+def table_arrays(text, columns):
+    """Parse the rows of a table into one float64 array per column (requires NumPy).
+
+    Rows are those lines with as many numbers as there are columns and no
+    ``#``, as for :func:`table_rules`.  A table with nothing else after its
+    header is read in a single bulk parse.
+
+    :param text: the whole table
+    :param columns: names of the columns, in order
+    :return: dict of contiguous arrays of shape (nrows,), keyed by column name
+    """
+    from ..arrays import np, parse_floats
+
+    body = text[_HEADER.match(text).end():]
+    values = None
+    if '#' not in body:
+        try:
+            values = np.fromstring(body, sep=' ')
+        except ValueError:
+            # text that is not all numbers, left to the filter below
+            pass
+        else:
+            # counting newlines is much cheaper than counting non-blank lines, which is needed only with blank lines
+            nrows = body.count('\n') + (not body.endswith('\n'))
+            if len(values) != len(columns) * nrows and len(values) != len(columns) * len(_ROW.findall(body)):
+                values = None
+    if values is None:
+        values = parse_floats([line for line in body.splitlines() if _is_row(len(columns), line)], len(columns))
+    values = np.ascontiguousarray(values.reshape(-1, len(columns)).T)
+    return dict(zip(columns, values))
+
+
+class TableParser(BlockParser):
+    """Parser of a numeric table under ``#`` header lines.
+
+    :meth:`parse` yields one dict per row, keyed by the names in
+    :attr:`columns`; :meth:`parse_arrays` and :meth:`parse_file_arrays` read
+    the whole table into one array per column instead.
+    """
+
+    # names of the columns, in order
+    columns = ()
+
+    def __init__(self, rules=None):
+        BlockParser.__init__(self)
+        for rule in table_rules(self.columns) if rules is None else rules:
+            self.add_rule(rule)
+
+    def parse_arrays(self, generator):
+        """Parse the lines of a table into one float64 array per column (requires NumPy)"""
+        return table_arrays(''.join(line if line.endswith('\n') else line + '\n' for line in generator),
+                            self.columns)
+
+    def parse_file_arrays(self, path, encoding='utf-8'):
+        """Parse a table file, possibly compressed, into one float64 array per column (requires NumPy)"""
+        with open_decompressed(path) as f:
+            text = f.read().decode(encoding, 'replace')
+        return table_arrays(text, self.columns)
@@ -0,0 +1,60 @@
+import gzip
+
+import pytest
+
+from dftparse.wien2k.case import Wien2kCase, find_case
+
+SCF = ":ENE  : ********** TOTAL ENERGY IN Ry =       -94844.23535782\n"
+SCF2 = ":GAP (global)   :    0.0452 Ry =     0.614 eV (accurate value if proper k-mesh)\n"
+EPSILON = ("# Energy [eV] Re_eps_xx Im_eps_xx Re_eps_zz Im_eps_zz\n"
+           "   0.312930  0.947976E+01  0.126675E+00  0.793167E+01  0.955959E-01\n"
+           "   0.326536  0.948270E+01  0.132368E+00  0.793380E+01  0.998902E-01\n")
+
+
+@pytest.fixture
+def case_directory(tmp_path):
+    directory = tmp_path / "TiO2"
+    directory.mkdir()
+    (directory / "TiO2.scf").write_text(SCF * 2)
+    (directory / "TiO2.scf2").write_text(SCF2)
+    with gzip.open(str(directory / "TiO2.epsilon.gz"), "wt") as f:
+        f.write(EPSILON)
+    (directory / "other.sigmak").write_text("")
+    return directory
+
+
+def test_find_case(case_directory):
+    """Test that the files of a case are found by the directory name, compressed or not"""
+    paths = find_case(str(case_directory))
+    assert list(paths) == ["scf", "scf2", "epsilon"]
+    assert paths["epsilon"].endswith("TiO2.epsilon.gz")
+    assert list(find_case(str(case_directory), "other")) == ["sigmak"]
+
+
+def test_lazy_sections(case_directory):
+    """Test that each section is parsed when it is first accessed"""
+    case = Wien2kCase(str(case_directory))
+    assert len(case) == 3 and "sigmak" not in case
+    assert not case.loaded("scf2")
+    assert case["scf2"] == [{"band gap": 0.614, "band gap units": "eV"}]
+    assert case.loaded("scf2") and not case.loaded("scf")
+    assert [block["total energy"] for block in case["scf"]] == [-94844.235357] * 2
+    with pytest.raises(KeyError):
+        case["sigmak"]
+
+
+def test_load(case_directory):
+    """Test that loading parses every section in worker processes, as accessing them would"""
+    case = Wien2kCase(str(case_directory)).load(processes=2)
+    assert all(case.loaded(extension) for extension in case)
+    assert case["epsilon"][1]["im_eps_zz"] == 0.0998902
+    assert dict(case) == dict(Wien2kCase(str(case_directory)))
+
+
+def test_load_arrays(case_directory):
+    """Test that the optics tables and the .scf history are parsed into arrays"""
+    np = pytest.importorskip("numpy")
+    case = Wien2kCase(str(case_directory), arrays=True).load(["epsilon", "scf"])
+    np.testing.assert_array_equal(case["epsilon"]["energy"], [0.31293, 0.326536])
+    assert case["scf"]["iteration"].shape == (0,)
+    assert case["scf2"][0]["band gap"] == 0.614
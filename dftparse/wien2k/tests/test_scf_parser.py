@@ -1,3 +1,5 @@
+import pytest
+
 from dftparse.wien2k.scf_parser import ScfParser
 
 
@@ -21,3 +23,56 @@ def test_parse_energy():
     res = _flatten(ScfParser().parse(lines))
     assert res["total energy"] == -94844.23, "Parsed the total energy incorrectly"
     assert res["total energy units"] == "Ry", "Incorrect units for total energy"
+
+
+SCF_ITERATION = """
+:ITE{n:03d}: {n:2d}. ITERATION
+
+       SUBSTANCE: test
+
+:NATO :    2 INDEPENDENT AND    2 TOTAL ATOMS IN UNITCELL
+:LAT  : LATTICE CONSTANTS=  10.26300 10.26300 10.26300
+:VOL  : UNIT CELL VOLUME =     270.24083
+:RKM  : MATRIX SIZE  113LOs:  8 RKM= 5.52 WEIGHT= 2.00  PGR:
+:FER  : F E R M I - ENERGY(TETRAH.M.)=   0.42964285{n}
+:GAP (global)   :    0.0473 Ry =     0.643 eV (accurate value if proper k-mesh)
+:CTO001: TOTAL CHARGE IN SPHERE   1 =   12.1406131
+:NEC01: NUCLEAR AND ELECTRONIC CHARGE     28.00000     27.99999      0.99999
+:MMI001: MAGNETIC MOMENT IN SPHERE   1    =    2.17389
+{mmi2}:DIS  :  CHARGE DISTANCE       ( 0.0000336 for atom    1 spin 1)      0.000023{n}
+:ENE  : ********** TOTAL ENERGY IN Ry =       -1160.0236962{n}
+
+       TOTAL FORCE IN mRy/a.u. = |F|     Fx             Fy             Fz     with/without FOR in case.in2
+:FOR001:   1.ATOM         13.660          0.000          0.000        -13.660 partial forces
+:FGL002:   2.ATOM          0.000          0.000         -1.{n}00 total forces
+:ENERGY convergence:  0 0.0001 .0000001200000000
+"""
+
+
+def test_energy_convergence_not_total_energy():
+    """Test that the ":ENERGY convergence" lines are not taken for total energies"""
+    lines = SCF_ITERATION.format(n=1, mmi2="").split("\n")
+    assert [r.block["total energy"] for r in ScfParser().parse(lines, sparse=True)] == [-1160.0236962]
+
+
+def test_parse_history():
+    """Test that every record of every iteration is parsed into arrays indexed by iteration and atom"""
+    np = pytest.importorskip("numpy")
+    lines = (SCF_ITERATION.format(n=1, mmi2="")
+             + SCF_ITERATION.format(n=2, mmi2=":MMI002: MAGNETIC MOMENT IN SPHERE   2    =   -0.50000\n")).split("\n")
+    history = ScfParser().parse_history(lines)
+
+    np.testing.assert_array_equal(history["iteration"], [1, 2])
+    np.testing.assert_array_equal(history[":FER"], [0.429642851, 0.429642852])
+    np.testing.assert_array_equal(history[":ENE"], [-1160.02369621, -1160.02369622])
+    np.testing.assert_array_equal(history[":DIS"], [0.0000231, 0.0000232])
+    np.testing.assert_array_equal(history[":LAT"][1], [10.263] * 3)
+    np.testing.assert_array_equal(history[":GAP (global)"][0], [0.0473, 0.643])
+    np.testing.assert_array_equal(history[":NATO"][0], [2, 2])
+    assert history[":MMI"].shape == (2, 2)
+    assert np.isnan(history[":MMI"][0, 1])
+    assert history[":MMI"][1, 1] == -0.5
+    assert history[":FOR"].shape == (2, 1, 4)
+    np.testing.assert_array_equal(history[":FGL"][:, 1], [[0, 0, -1.1], [0, 0, -1.2]])
+    assert np.isnan(history[":FGL"][0, 0]).all()
+    np.testing.assert_array_equal(history[":ENERGY convergence"][0], [0, 0.0001, 0.00000012])
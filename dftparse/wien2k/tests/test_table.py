@@ -0,0 +1,69 @@
+import gzip
+
+import pytest
+
+from dftparse.wien2k.absorp_parser import AbsorpParser
+from dftparse.wien2k.eloss_parser import ElossParser
+from dftparse.wien2k.epsilon_parser import EpsilonParser
+from dftparse.wien2k.reflectivity_parser import ReflectivityParser
+from dftparse.wien2k.refract_parser import RefractionParser
+from dftparse.wien2k.sigmak_parser import SigmakParser
+
+HEADER = """#
+# Lorentzian broadening with gamma= 0.100000  [eV]
+# Im(epsilon) shifted by   0.0000   [eV]
+#
+# Energy [eV] {}
+#
+"""
+VALUES = [0.312930, 0.947976E+01, 0.126675E+00, 0.793167E+01, 0.955959E-01, -0.1E-02]
+
+
+def _table(ncolumns, rows=4):
+    return HEADER.format("column " * (ncolumns - 1)) + "".join(
+        "".join("{:14.6E}".format(value + row) for value in VALUES[:ncolumns]) + "\n" for row in range(rows))
+
+
+@pytest.mark.parametrize("parser_class", [
+    AbsorpParser, ElossParser, EpsilonParser, ReflectivityParser, RefractionParser, SigmakParser,
+])
+def test_parse_arrays(tmp_path, parser_class):
+    """Test that the columns parsed in bulk agree with the rows parsed one by one"""
+    np = pytest.importorskip("numpy")
+    parser = parser_class()
+    text = _table(len(parser.columns))
+    rows = [row for row in parser.parse(text.splitlines()) if row]
+
+    arrays = parser.parse_arrays(text.splitlines())
+    assert list(arrays) == list(parser.columns)
+    for key in parser.columns:
+        np.testing.assert_array_equal(arrays[key], [row[key] for row in rows])
+        assert arrays[key].flags["C_CONTIGUOUS"]
+
+    path = tmp_path / "case.table.gz"
+    path.write_bytes(gzip.compress(text.encode()))
+    for key, values in parser.parse_file_arrays(str(path)).items():
+        np.testing.assert_array_equal(values, arrays[key])
+
+
+def test_parse_arrays_irregular_rows():
+    """Test that lines that are not rows of the table are skipped, as when parsing rows one by one"""
+    np = pytest.importorskip("numpy")
+    parser = ElossParser()
+    lines = _table(3, rows=2).splitlines() + ["", "   2.0  3.0", "   3.0  4.0  5.0  # note", "   4.0  5.0  6.0"]
+    arrays = parser.parse_arrays(lines)
+    np.testing.assert_array_equal(arrays["energy"], [row["energy"] for row in parser.parse(lines) if row])
+    np.testing.assert_array_equal(arrays["eloss_zz"][-1], 6.0)
+
+    empty = parser.parse_arrays(HEADER.splitlines())
+    assert empty["energy"].shape == (0,)
+
+
+def test_parse_arrays_text_lines():
+    """Test that a line of text that is not a row, and has no "#", is skipped rather than failing the bulk parse"""
+    np = pytest.importorskip("numpy")
+    parser = EpsilonParser()
+    lines = _table(5, rows=3).splitlines() + [" end of table"]
+    arrays = parser.parse_arrays(lines)
+    np.testing.assert_array_equal(arrays["energy"], [row["energy"] for row in parser.parse(lines) if row])
+    assert arrays["energy"].shape == (3,)
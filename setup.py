@@ -5,7 +5,8 @@ setup(
     version='0.3.0',
     description='Library for parsing Density Functional Theory calculations',
     url='https://github.com/CitrineInformatics/dftparse',
+    python_requires='>=3.6',
     install_requires=[],
-    extras_require={},
-    packages=find_packages(exclude=('docs'))
+    extras_require={'arrays': ['numpy'], 'zstd': ['zstandard']},
+    packages=find_packages(exclude=('docs', 'benchmarks', 'benchmarks.*'))
 )